@@ -1,17 +1,53 @@
+import asyncio
 from fastapi import FastAPI
 from routes.auth_routes import auth_router
 from routes.flight_routes import flight_router
 from routes.ambulance_routes import ambulance_router
 from routes.aircraft_routes import aircraft_router 
 from routes.schedule_routes import schedule_router # ✅ added
+from routes.audit_routes import audit_router
+from routes.routing_routes import routing_router
+from routes.bulk_routes import bulk_router
+from routes.admin_routes import admin_router
+from routes.telemetry_routes import telemetry_router
+from database import close_client
+from shared_state import close_shared_state
+from maintenance_scheduler import maintenance_sweeper
+from audit_log import audit_log
+from telemetry import telemetry_ingestor
+from repository import ensure_tenant_indexes
+from profiling import SlowRequestMiddleware, loop_lag_monitor
 
 app = FastAPI(title="Air Ambulance Backend")
+app.add_middleware(SlowRequestMiddleware)
 
 app.include_router(auth_router, prefix="/api/auth")
 app.include_router(flight_router, prefix="/api/flight")
 app.include_router(ambulance_router, prefix="/api/ambulance")
 app.include_router(aircraft_router, prefix="/api/aircraft")
 app.include_router(schedule_router, prefix="/api/schedule") # ✅ added
+app.include_router(audit_router, prefix="/api/audit")
+app.include_router(routing_router, prefix="/api/routing")
+app.include_router(bulk_router, prefix="/api/bulk")
+app.include_router(admin_router, prefix="/api/admin")
+app.include_router(telemetry_router, prefix="/api/telemetry")
+
+@app.on_event("startup")
+async def startup():
+    loop_lag_monitor.start()
+    audit_log.start()
+    maintenance_sweeper.start()
+    telemetry_ingestor.start()
+    app.state.index_task = asyncio.create_task(ensure_tenant_indexes())
+
+@app.on_event("shutdown")
+async def shutdown():
+    await telemetry_ingestor.stop()
+    await maintenance_sweeper.stop()
+    await audit_log.stop()
+    await loop_lag_monitor.stop()
+    close_client()
+    await close_shared_state()
 
 @app.get("/")
 async def root():
@@ -0,0 +1,154 @@
+# audit_log.py
+"""
+Append-only audit/event log.
+
+Routes call `audit_log.record(...)`, which only drops the event on an
+in-memory queue - it never waits on Mongo. A background task drains the
+queue and writes events in batches with insert_many into the `events`
+time-series collection (time field `ts`, meta field `meta` holding the
+tenant, entity type and id), so entity documents no longer grow with history.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+EVENTS_COLLECTION = "events"
+QUEUE_SIZE = 50000          # events buffered before new ones are dropped
+BATCH_SIZE = 500            # max events per insert_many
+FLUSH_INTERVAL = 0.5        # seconds to wait for a batch to fill up
+RETRY_SECONDS = 5
+
+
+async def ensure_events_collection():
+    """Create the time-series collection (falls back to a plain one on old servers)"""
+    try:
+        await db.create_collection(
+            EVENTS_COLLECTION,
+            timeseries={"timeField": "ts", "metaField": "meta", "granularity": "seconds"},
+        )
+    except CollectionInvalid:
+        pass  # already exists
+    except OperationFailure:
+        logger.warning("time-series collections unsupported; using a regular collection for events")
+    await db[EVENTS_COLLECTION].create_index(
+        [("meta.tenant", ASCENDING), ("meta.entity", ASCENDING), ("meta.entity_id", ASCENDING), ("ts", DESCENDING)]
+    )
+    # platform-wide (unscoped) timeline lookups
+    await db[EVENTS_COLLECTION].create_index(
+        [("meta.entity", ASCENDING), ("meta.entity_id", ASCENDING), ("ts", DESCENDING)]
+    )
+    await db[EVENTS_COLLECTION].create_index([("ts", ASCENDING)])
+
+
+class AuditLog:
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending = []          # batch taken off the queue but not yet written
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush what is queued, then stop the writer"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        batch, self._pending = self._pending, []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            try:
+                await self._write(batch)
+            except Exception:
+                logger.exception("dropping %d audit events on shutdown", len(batch))
+
+    def record(
+        self,
+        entity: str,
+        entity_id,
+        action: str,
+        actor: Optional[str] = None,
+        data: Optional[dict] = None,
+        tenant: Optional[str] = None,
+    ):
+        """Queue one event. Never blocks; drops (and counts) if the buffer is full."""
+        meta = {"entity": entity, "entity_id": str(entity_id)}
+        if tenant is not None:
+            meta["tenant"] = tenant
+        event = {
+            "ts": datetime.utcnow(),
+            "meta": meta,
+            "action": action,
+            "actor": actor,
+            "data": data or {},
+        }
+        if self._queue is None:
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _write(self, batch):
+        await db[EVENTS_COLLECTION].insert_many(batch, ordered=False)
+        self.written += len(batch)
+
+    async def _collect(self):
+        batch = self._pending = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + FLUSH_INTERVAL
+        while len(batch) < BATCH_SIZE:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        try:
+            await ensure_events_collection()
+        except Exception:
+            logger.exception("could not prepare the events collection")
+        while True:
+            batch = await self._collect()
+            while True:
+                try:
+                    await self._write(batch)
+                    self._pending = []
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logger.exception("audit batch of %d failed; retrying", len(batch))
+                    await asyncio.sleep(RETRY_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+audit_log = AuditLog()
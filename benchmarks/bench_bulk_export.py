@@ -0,0 +1,101 @@
+# benchmarks/bench_bulk_export.py
+"""
+Export encoder throughput and memory on 1M aircraft rows.
+
+    python benchmarks/bench_bulk_export.py --rows 1000000
+
+Documents come from an in-memory async generator shaped like a Motor cursor
+(no database), so the numbers are the cost of our encoding and streaming
+path. Peak memory is measured with tracemalloc in a separate, shorter pass
+(tracing slows Python down several-fold) and should stay flat as rows grow. The CSV output is then parsed back through the import parser
+to time the other direction.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+
+from bulk_io import ENTITIES, export_stream, parse_csv  # noqa: E402
+
+
+async def fake_cursor(rows: int):
+    now = datetime.utcnow()
+    for i in range(rows):
+        yield {
+            "_id": ObjectId(),
+            "aircraft_type": "Helicopter",
+            "registration": f"VT-{i:07d}",
+            "airline_operator": "Air Ambulance India",
+            "range_km": 550,
+            "speed_kmh": 300,
+            "max_payload_kg": 540,
+            "cabin_configuration": "2 medical seats, 2 stretcher",
+            "base_location": "Coimbatore Airport",
+            "medical_equipment_onboard": "Ventilator, Oxygen Cylinder",
+            "available": True,
+            "maintenance_records": [{"_id": ObjectId(), "maintenance_type": "A-check", "status": "completed"}],
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+async def run_export(rows: int, fmt: str, keep_path: str = None):
+    out = open(keep_path, "w") if keep_path else None
+    total_bytes = 0
+    started = time.perf_counter()
+    async for chunk in export_stream(ENTITIES["aircraft"], fake_cursor(rows), fmt):
+        total_bytes += len(chunk)
+        if out:
+            out.write(chunk)
+    elapsed = time.perf_counter() - started
+    if out:
+        out.close()
+    print(f"export {fmt:<6} {rows / elapsed:10.0f} rows/s  {total_bytes / elapsed / 1e6:7.1f} MB/s")
+
+
+async def run_memory(rows: int, fmt: str):
+    tracemalloc.start()
+    async for _ in export_stream(ENTITIES["aircraft"], fake_cursor(rows), fmt):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"memory {fmt:<6} peak {peak / 1e6:6.2f} MB over {rows} rows")
+
+
+async def run_parse(path: str, rows: int):
+    async def body():
+        with open(path, "rb") as f:
+            while chunk := f.read(64 * 1024):
+                yield chunk
+
+    started = time.perf_counter()
+    parsed = 0
+    async for _ in parse_csv(body()):
+        parsed += 1
+    elapsed = time.perf_counter() - started
+    print(f"parse  csv    {parsed / elapsed:10.0f} rows/s  ({parsed} of {rows} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    csv_path = os.path.join(os.getenv("TMPDIR", "/tmp"), "bench_aircraft_export.csv")
+    asyncio.run(run_export(args.rows, "ndjson"))
+    asyncio.run(run_export(args.rows, "csv", keep_path=csv_path))
+    asyncio.run(run_parse(csv_path, args.rows))
+    os.remove(csv_path)
+    for rows in (args.rows // 100, args.rows // 10):
+        asyncio.run(run_memory(rows, "csv"))
+
+
+if __name__ == "__main__":
+    main()
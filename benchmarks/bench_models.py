@@ -0,0 +1,140 @@
+# benchmarks/bench_models.py
+"""
+Per-model validate / serialize cost: pydantic-core paths vs the old ones.
+
+    python benchmarks/bench_models.py --docs 2000 --repeat 5
+
+For each model:
+  * validate  - request body bytes -> model:
+                Model(**json.loads(body))  vs  Model.model_validate_json(body)
+  * serialize - Mongo documents -> JSON response body:
+                utils.serialize_doc + jsonable_encoder + json.dumps (old list
+                routes)  vs  TypeAdapter(List[ModelOut]) validate + dump_json
+                (http_cache.conditional_json with an adapter)
+
+Numbers are microseconds per document, best of --repeat runs.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from models.aircraft import Aircraft, AircraftListAdapter  # noqa: E402
+from models.ambulance import Ambulance, AmbulanceListAdapter  # noqa: E402
+from models.flight_request import FlightRequest, FlightRequestListAdapter  # noqa: E402
+from models.schedule import ScheduleCreate, ScheduleListAdapter  # noqa: E402
+from utils import serialize_doc  # noqa: E402
+
+
+def aircraft_doc(i: int, now: datetime) -> dict:
+    return {
+        "_id": ObjectId(), "aircraft_type": "Helicopter", "registration": f"VT-{i:05d}",
+        "airline_operator": f"Operator {i % 20}", "range_km": 550, "speed_kmh": 300,
+        "max_payload_kg": 540, "cabin_configuration": "2 medical seats, 2 stretcher",
+        "base_location": "Coimbatore Airport", "medical_equipment_onboard": "Ventilator, Oxygen",
+        "available": True, "last_maintenance_date": now, "image_url": None,
+        "maintenance_records": [{
+            "_id": ObjectId(), "maintenance_type": "100h inspection", "description": "routine",
+            "last_maintenance_date": now, "next_due_date": now + timedelta(days=30),
+            "status": "scheduled", "technician": "tech@example.com",
+        } for _ in range(2)],
+        "created_at": now, "updated_at": now, "maintenance_hold": False, "tenant": f"Operator {i % 20}",
+    }
+
+
+def flight_request_doc(i: int, now: datetime) -> dict:
+    return {
+        "_id": ObjectId(), "requester": "dispatch@example.com",
+        "from_location": {"lat": 11.0, "lng": 76.9}, "from_hospital": "KMCH",
+        "from_address": "Avanashi Road", "to_location": {"lat": 13.0, "lng": 80.2},
+        "to_hospital": "Apollo", "to_address": "Greams Road", "flight_datetime": now,
+        "route": "CJB-MAA", "medical_staff": ["dr.a", "nurse.b"],
+        "medicalEquipmentOnboard": "Ventilator", "status": "Pending", "special_instructions": None,
+    }
+
+
+def schedule_doc(i: int, now: datetime) -> dict:
+    return {
+        "_id": ObjectId(), "flight_request_id": str(ObjectId()), "scheduled_by": "dispatch@example.com",
+        "scheduled_at": now, "departure_time_utc": now, "arrival_time_utc": None,
+        "estimated_duration_minutes": 75, "notes": None, "assigned_crew": ["pilot", "medic"],
+        "status": "Scheduled", "eta": {"eta_utc": now, "estimated_duration_minutes": 75, "last_updated": now},
+        "created_at": now, "updated_at": now,
+    }
+
+
+def ambulance_doc(i: int, now: datetime) -> dict:
+    return {
+        "_id": ObjectId(), "id": None, "name": f"AMB-{i}", "type": "ALS", "capacity": 2,
+        "maintenance_records": [{"date": now.isoformat(), "details": "oil change"}],
+        "available": True, "last_maintenance_date": now.isoformat(),
+    }
+
+
+def request_body(model, doc: dict) -> bytes:
+    body = {k: v for k, v in doc.items() if k in model.model_fields and k != "id"}
+    if model is FlightRequest:
+        body.update(flight_date=doc["flight_datetime"].date(), flight_time=doc["flight_datetime"].time())
+    if model is Aircraft:
+        body["maintenance_records"] = [{k: v for k, v in r.items() if k != "_id"} for r in doc["maintenance_records"]]
+    return json.dumps(jsonable_encoder(body)).encode()
+
+
+def old_serialize(docs):
+    out = [serialize_doc(d) for d in docs]
+    return json.dumps(jsonable_encoder(out), separators=(",", ":")).encode()
+
+
+def new_serialize(adapter, docs):
+    return adapter.dump_json(adapter.validate_python(docs), by_alias=True)
+
+
+def best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+CASES = [
+    ("Aircraft", Aircraft, AircraftListAdapter, aircraft_doc),
+    ("FlightRequest", FlightRequest, FlightRequestListAdapter, flight_request_doc),
+    ("Schedule", ScheduleCreate, ScheduleListAdapter, schedule_doc),
+    ("Ambulance", Ambulance, AmbulanceListAdapter, ambulance_doc),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.utcnow().replace(microsecond=0)
+    print(f"{args.docs} docs per model, best of {args.repeat}; microseconds per doc\n")
+    print(f"{'model':<14} {'validate old':>13} {'validate new':>13} {'x':>6}   {'serialize old':>14} {'serialize new':>14} {'x':>6}")
+    for name, model, adapter, make in CASES:
+        docs = [make(i, now) for i in range(args.docs)]
+        bodies = [request_body(model, d) for d in docs]
+
+        v_old = best(lambda: [model(**json.loads(b)) for b in bodies], args.repeat)
+        v_new = best(lambda: [model.model_validate_json(b) for b in bodies], args.repeat)
+        s_old = best(lambda: old_serialize(docs), args.repeat)
+        s_new = best(lambda: new_serialize(adapter, docs), args.repeat)
+
+        per = 1e6 / args.docs
+        print(f"{name:<14} {v_old * per:>13.2f} {v_new * per:>13.2f} {v_old / v_new:>5.1f}x"
+              f"   {s_old * per:>14.2f} {s_new * per:>14.2f} {s_old / s_new:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_query_cache.py
+"""
+Schedule lookups through AsyncLRUCache vs straight to the database.
+
+    python benchmarks/bench_query_cache.py --keys 20000 --lookups 200000
+
+Keys are drawn from a Zipf distribution (a few schedules are being tracked
+by many screens at once, a long tail is looked at rarely). Mongo is
+simulated with a fixed per-read latency so the numbers isolate the cache;
+shared state is the local SQLite backend in a temp file.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SHARED_STATE_PATH", os.path.join(tempfile.mkdtemp(), "bench_state.sqlite3"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_cache import AsyncLRUCache  # noqa: E402
+
+
+def zipf_keys(n_keys: int, n_lookups: int, s: float, seed: int = 7):
+    rng = random.Random(seed)
+    weights = [1.0 / (rank ** s) for rank in range(1, n_keys + 1)]
+    return rng.choices(range(n_keys), weights=weights, k=n_lookups)
+
+
+class FakeCollection:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.reads = 0
+
+    async def find_one(self, key: str):
+        self.reads += 1
+        await asyncio.sleep(self.latency)
+        return {"_id": key, "status": "In-Transit", "assigned_crew": ["a", "b"]}
+
+
+async def run(keys, concurrency: int, latency: float, cache: AsyncLRUCache = None, write_ratio: float = 0.0):
+    collection = FakeCollection(latency)
+    queue = iter(keys)
+    rng = random.Random(11)
+
+    async def worker():
+        for k in queue:
+            key = str(k)
+            if cache is None:
+                await collection.find_one(key)
+                continue
+            await cache.get(key, lambda: collection.find_one(key))
+            if rng.random() < write_ratio:
+                await cache.put(key, {"_id": key, "status": "Completed"})
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return time.perf_counter() - started, collection.reads
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--write-ratio", type=float, default=0.02,
+                        help="fraction of lookups followed by a write-through put")
+    args = parser.parse_args()
+
+    keys = zipf_keys(args.keys, args.lookups, args.zipf)
+    latency = args.latency_ms / 1000
+
+    elapsed, reads = asyncio.run(run(keys, args.concurrency, latency))
+    print(f"uncached  {len(keys) / elapsed:10.0f} lookups/s  db reads={reads}")
+
+    cache = AsyncLRUCache("bench_schedules", max_size=args.cache_size)
+    elapsed, reads = asyncio.run(run(keys, args.concurrency, latency, cache, args.write_ratio))
+    print(f"cached    {len(keys) / elapsed:10.0f} lookups/s  db reads={reads}")
+    for name, value in cache.stats().items():
+        print(f"  {name:<10} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_route_planner.py
+"""
+Matrix build time and route query latency for a synthetic site registry.
+
+    python benchmarks/bench_route_planner.py --sites 5000 --queries 200
+
+Sites are scattered over India; every 5th one can refuel. Queries use
+random site pairs and a range that forces multi-leg routes.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("ROUTE_MATRIX_DIR", tempfile.mkdtemp())
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from route_planner import RoutePlanner, NoRouteError  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sites", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--range-km", type=float, default=550)
+    parser.add_argument("--speed-kmh", type=float, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    sites = [{
+        "code": f"S{i:05d}",
+        "name": f"site {i}",
+        "latitude": float(rng.uniform(8, 30)),
+        "longitude": float(rng.uniform(70, 90)),
+        "can_refuel": i % 5 == 0,
+    } for i in range(args.sites)]
+
+    planner = RoutePlanner()
+    started = time.perf_counter()
+    planner.sites, planner.index, planner.refuel_mask, planner.distances, _ = RoutePlanner._load(sites)
+    print(f"build     {time.perf_counter() - started:8.3f} s  ({args.sites} sites)")
+
+    started = time.perf_counter()
+    planner.sites, planner.index, planner.refuel_mask, planner.distances, _ = RoutePlanner._load(sites)
+    print(f"mmap open {(time.perf_counter() - started) * 1000:8.3f} ms")
+
+    pairs = rng.integers(0, args.sites, size=(args.queries, 2))
+    started = time.perf_counter()
+    for i, j in pairs:
+        planner.distance_km(int(i), int(j))
+    print(f"lookup    {(time.perf_counter() - started) / args.queries * 1e6:8.3f} µs")
+
+    timings, legs, failed = [], [], 0
+    for i, j in pairs:
+        started = time.perf_counter()
+        try:
+            route = planner.plan(int(i), int(j), args.range_km, args.speed_kmh)
+            legs.append(len(route["legs"]))
+        except NoRouteError:
+            failed += 1
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    print(f"route     p50={timings[len(timings) // 2]:.2f} ms  p99={timings[int(len(timings) * 0.99) - 1]:.2f} ms  "
+          f"max={timings[-1]:.2f} ms  avg legs={np.mean(legs) if legs else 0:.2f}  no-route={failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# benchmarks/bench_telemetry.py
+"""
+Telemetry ingest throughput for one worker, and how many DB writes it costs.
+
+    python benchmarks/bench_telemetry.py --aircraft 500 --seconds 10 --rate 5000
+
+Simulates --aircraft In-Transit flights each reporting a fix every second
+(interval adjusted to hit --rate reports/s overall), sent in batches of
+--batch as JSON arrays (the HTTP/WebSocket body). Each batch is parsed with
+the route's parse_batch and submitted; the ingestor flushes every simulated
+second. Mongo is an in-memory fake that counts calls, so the numbers are
+the CPU cost of parse + coalesce + flush and the write amplification.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SHARED_STATE_PATH", os.path.join(tempfile.mkdtemp(), "bench_state.sqlite3"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+
+import telemetry  # noqa: E402
+from routes.telemetry_routes import parse_batch  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        self._it = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = {d["_id"]: d for d in (docs or [])}
+        self.calls = {"insert_many": 0, "bulk_write": 0, "find": 0}
+        self.inserted = 0
+        self.updated = 0
+
+    def find(self, query, projection=None):
+        self.calls["find"] += 1
+        ids = set(query["_id"]["$in"])
+        status = query.get("status")
+        return FakeCursor([d for i, d in self.docs.items() if i in ids and (status is None or d.get("status") == status)])
+
+    async def insert_many(self, docs, ordered=True):
+        self.calls["insert_many"] += 1
+        self.inserted += len(docs)
+
+    async def bulk_write(self, ops, ordered=True):
+        self.calls["bulk_write"] += 1
+        for op in ops:
+            doc = self.docs[op._filter["_id"]]
+            doc.update(op._doc["$set"])
+        self.updated += len(ops)
+
+        class Result:
+            modified_count = len(ops)
+        return Result()
+
+
+class FakeDB(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+
+def build_world(n_aircraft: int, now: datetime):
+    rng = random.Random(3)
+    schedules, flight_requests, flights = [], [], []
+    for i in range(n_aircraft):
+        fr_id, s_id = ObjectId(), ObjectId()
+        dest = (rng.uniform(8, 30), rng.uniform(70, 90))
+        start = (dest[0] + rng.uniform(-3, 3), dest[1] + rng.uniform(-3, 3))
+        flight_requests.append({"_id": fr_id, "to_location": {"lat": dest[0], "lng": dest[1]}, "to_hospital": "x"})
+        schedules.append({"_id": s_id, "flight_request_id": str(fr_id), "status": "In-Transit",
+                          "eta": {"eta_utc": now + timedelta(hours=1), "estimated_duration_minutes": 60},
+                          "tenant": f"op{i % 10}"})
+        flights.append({"schedule_id": str(s_id), "aircraft": f"VT-{i:04d}", "pos": list(start),
+                        "step": ((dest[0] - start[0]) / 3600, (dest[1] - start[1]) / 3600),
+                        "speed": rng.uniform(200, 320)})
+    return schedules, flight_requests, flights
+
+
+async def run(args):
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    schedules, flight_requests, flights = build_world(args.aircraft, now)
+    fake = FakeDB(schedules=FakeCollection(schedules), flight_requests=FakeCollection(flight_requests),
+                  telemetry=FakeCollection())
+    fake[telemetry.TELEMETRY_COLLECTION] = fake["telemetry"]
+    telemetry.db = fake   # audit_log is not started: its events are only counted as dropped
+    ingestor = telemetry.TelemetryIngestor()
+
+    per_second = args.rate
+    reports = 0
+    parse_s = submit_s = flush_s = 0.0
+    for second in range(args.seconds):
+        ts = now + timedelta(seconds=second)
+        fixes = []
+        for k in range(per_second):
+            f = flights[k % len(flights)]
+            f["pos"][0] += f["step"][0]
+            f["pos"][1] += f["step"][1]
+            fixes.append({"schedule_id": f["schedule_id"], "aircraft": f["aircraft"],
+                          "ts": (ts + timedelta(milliseconds=k % 1000)).isoformat() + "Z",
+                          "latitude": f["pos"][0], "longitude": f["pos"][1], "ground_speed_kmh": f["speed"]})
+        bodies = [json.dumps(fixes[i:i + args.batch]).encode() for i in range(0, len(fixes), args.batch)]
+
+        for body in bodies:
+            t0 = time.perf_counter()
+            batch = parse_batch(body)
+            t1 = time.perf_counter()
+            ingestor.submit(batch, None)
+            t2 = time.perf_counter()
+            parse_s += t1 - t0
+            submit_s += t2 - t1
+        reports += len(fixes)
+        t0 = time.perf_counter()
+        await ingestor.flush()
+        flush_s += time.perf_counter() - t0
+
+    total = parse_s + submit_s + flush_s
+    print(f"{reports} reports from {args.aircraft} aircraft over {args.seconds} simulated s, batches of {args.batch}")
+    print(f"  parse   {parse_s * 1e6 / reports:6.2f} us/report")
+    print(f"  submit  {submit_s * 1e6 / reports:6.2f} us/report")
+    print(f"  flush   {flush_s * 1e6 / reports:6.2f} us/report")
+    print(f"  => {reports / total:,.0f} reports/s of CPU per worker")
+    print(f"  telemetry: {fake.telemetry.calls['insert_many']} insert_many calls, {fake.telemetry.inserted} fixes stored")
+    print(f"  schedules: {fake.schedules.calls['bulk_write']} bulk_write calls, {fake.schedules.updated} eta updates, "
+          f"{fake.schedules.calls['find']} target loads")
+    print(f"  ingestor: {ingestor.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--aircraft", type=int, default=500)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--rate", type=int, default=5000, help="reports per simulated second")
+    parser.add_argument("--batch", type=int, default=100, help="reports per HTTP/WebSocket message")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
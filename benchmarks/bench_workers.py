@@ -0,0 +1,110 @@
+# benchmarks/bench_workers.py
+"""
+Throughput at 1, 2, 4 and 8 gunicorn workers using gunicorn_conf.py.
+
+    python benchmarks/bench_workers.py --path / --duration 10
+
+For each worker count the script starts gunicorn on a free port, waits for
+it to answer, then drives it with keep-alive connections spread over several
+client processes (so the load generator is not limited by one GIL).
+Hit a Mongo-backed path (e.g. /api/aircraft/list-aircrafts) with MONGO_URI
+set to measure the realistic case.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port: int, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not start")
+
+
+async def _connection(port: int, path: str, deadline: float) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+    done = 0
+    while time.time() < deadline:
+        writer.write(request)
+        headers = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in headers.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        if length:
+            await reader.readexactly(length)
+        done += 1
+    writer.close()
+    return done
+
+
+def _client(args) -> int:
+    port, path, connections, duration = args
+
+    async def run():
+        deadline = time.time() + duration
+        counts = await asyncio.gather(*[_connection(port, path, deadline) for _ in range(connections)])
+        return sum(counts)
+
+    return asyncio.run(run())
+
+
+def bench(workers: int, path: str, duration: float, clients: int, connections: int) -> float:
+    port = _free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}",
+               ACCESS_LOG="", LOG_LEVEL="warning")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", "app:app"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        _wait_ready(port)
+        _client((port, path, 1, 1.0))  # warm-up every worker a little
+        with multiprocessing.Pool(clients) as pool:
+            started = time.time()
+            total = sum(pool.map(_client, [(port, path, connections, duration)] * clients))
+            elapsed = time.time() - started
+        return total / elapsed
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--connections", type=int, default=32, help="keep-alive connections per client")
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    print(f"path={args.path} duration={args.duration}s cores={multiprocessing.cpu_count()}")
+    baseline = None
+    for n in [int(w) for w in args.workers.split(",")]:
+        rps = bench(n, args.path, args.duration, args.clients, args.connections)
+        baseline = baseline or rps
+        print(f"workers={n:<2} {rps:10.0f} req/s  x{rps / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
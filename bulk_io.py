@@ -0,0 +1,336 @@
+# bulk_io.py
+"""
+Streaming CSV / NDJSON import and export.
+
+Export walks a Motor cursor and yields encoded text in batches, so memory
+stays constant however many documents there are. Import reads the request
+body as a stream, validates rows in chunks with the same Pydantic models the
+create routes use, and writes each chunk with one unordered bulk_write
+(upserts keyed by each entity's natural key). An upsert only `$set`s the
+columns the row actually has; model defaults go to `$setOnInsert`, so a file
+without e.g. an `available` column (or with an empty cell) leaves that field
+of existing documents alone.
+
+Nested values (lists, sub-documents) are JSON-encoded inside CSV cells.
+
+Rows carry a `tenant` column. A scoped (operator) import always writes into
+the caller's tenant and its upserts only match that tenant's documents; an
+unscoped import keeps the tenant given in each row.
+"""
+import codecs
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Type
+
+from bson import ObjectId
+from pydantic import BaseModel, ValidationError
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models.aircraft import Aircraft
+from models.ambulance import Ambulance
+from models.flight_request import FlightRequest
+from models.schedule import ETAInfo, ScheduleCreate, VALID_TRANSITIONS
+from query_cache import AsyncLRUCache, schedule_cache, flight_request_cache
+from repository import TENANT_FIELD
+
+CHUNK_ROWS = 1000            # rows validated and written per bulk_write
+EXPORT_BATCH_ROWS = 1000     # rows encoded per yielded chunk
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ("csv", "ndjson")
+
+
+# ------------------------------------------
+# ENTITY DEFINITIONS
+# ------------------------------------------
+@dataclass
+class BulkEntity:
+    collection: str
+    model: Type[BaseModel]
+    key: Optional[str]                       # natural upsert key; None = keyed by "id"
+    extra_columns: List[str] = field(default_factory=list)
+    insert_only: List[str] = field(default_factory=list)   # kept on re-import ($setOnInsert)
+    not_imported: List[str] = field(default_factory=list)  # exported, but owned by other routes
+    prepare: Optional[Callable[[dict, dict, dict], None]] = None  # (doc to $set, defaults, raw row), in place
+    to_row: Optional[Callable[[dict], dict]] = None         # stored doc -> export row
+    cache: Optional[AsyncLRUCache] = None                   # by-id cache to drop after an import
+    tenant_from: Optional[str] = None                       # field naming the owning tenant, if any
+
+    @property
+    def columns(self) -> List[str]:
+        fields = [f for f in self.model.model_fields if f != "id"]
+        return ["id"] + fields + [c for c in self.extra_columns if c not in fields] + [TENANT_FIELD]
+
+
+def _prepare_aircraft(doc: dict, defaults: dict, row: dict):
+    doc["updated_at"] = datetime.utcnow()
+
+
+def _prepare_flight_request(doc: dict, defaults: dict, row: dict):
+    # Same storage shape as create_flight_request
+    doc["flight_datetime"] = datetime.combine(doc.pop("flight_date"), doc.pop("flight_time"))
+
+
+def _flight_request_row(doc: dict) -> dict:
+    flight_dt = doc.get("flight_datetime")
+    if isinstance(flight_dt, datetime):
+        doc["flight_date"] = flight_dt.date()
+        doc["flight_time"] = flight_dt.time()
+    return doc
+
+
+def _prepare_schedule(doc: dict, defaults: dict, row: dict):
+    now = datetime.utcnow()
+    status = row.get("status")
+    if status is not None:
+        if status not in VALID_TRANSITIONS:
+            raise ValueError(f"invalid status {status!r}; expected one of {', '.join(VALID_TRANSITIONS)}")
+        doc["status"] = status
+    else:
+        defaults["status"] = "Scheduled"   # new schedules only; existing ones keep theirs
+    if row.get("eta") is not None:
+        doc["eta"] = ETAInfo.model_validate(row["eta"]).model_dump()
+    defaults["created_at"] = now
+    doc["updated_at"] = now
+
+
+ENTITIES: Dict[str, BulkEntity] = {
+    "aircraft": BulkEntity(
+        collection="aircrafts",
+        model=Aircraft,
+        key="registration",
+        extra_columns=["maintenance_hold"],
+        # maintenance history is written by the maintenance routes only
+        insert_only=["created_at", "maintenance_records"],
+        not_imported=["maintenance_records", "maintenance_hold"],
+        prepare=_prepare_aircraft,
+        tenant_from="airline_operator",
+    ),
+    "ambulance": BulkEntity(
+        collection="ambulances",
+        model=Ambulance,
+        key="name",
+    ),
+    "flight_request": BulkEntity(
+        collection="flight_requests",
+        model=FlightRequest,
+        key=None,
+        extra_columns=["flight_datetime", "approved_by", "approved_at"],
+        prepare=_prepare_flight_request,
+        to_row=_flight_request_row,
+        cache=flight_request_cache,
+    ),
+    "schedule": BulkEntity(
+        collection="schedules",
+        model=ScheduleCreate,
+        key=None,
+        extra_columns=["status", "eta", "created_at", "updated_at"],
+        insert_only=["created_at"],
+        prepare=_prepare_schedule,
+        cache=schedule_cache,
+    ),
+}
+
+
+# ------------------------------------------
+# EXPORT
+# ------------------------------------------
+def _json_default(value):
+    # Only called for types the C encoder can't handle itself
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+_encode_json = json.JSONEncoder(separators=(",", ":"), default=_json_default).encode
+
+
+def _export_row(entity: BulkEntity, doc: dict) -> dict:
+    doc["id"] = doc.pop("_id", None)
+    if entity.to_row:
+        doc = entity.to_row(doc)
+    return doc
+
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, (dict, list)):
+        return _encode_json(value)
+    return _json_default(value)
+
+
+async def export_stream(entity: BulkEntity, docs: AsyncIterator[dict], fmt: str) -> AsyncIterator[str]:
+    """Yield the export text in batches of EXPORT_BATCH_ROWS rows"""
+    columns = entity.columns
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+
+    rows = 0
+    async for doc in docs:
+        row = _export_row(entity, doc)
+        if writer is not None:
+            writer.writerow([_csv_cell(row.get(c)) for c in columns])
+        else:
+            buffer.write(_encode_json({c: row.get(c) for c in columns}))
+            buffer.write("\n")
+        rows += 1
+        if rows % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail
+
+
+# ------------------------------------------
+# IMPORT - PARSING
+# ------------------------------------------
+async def _lines(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in body:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _csv_value(value: str):
+    if value == "":
+        return None
+    if value[0] in "[{":
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+async def parse_csv(body: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    header = None
+    record = ""
+    async for line in _lines(body):
+        # A quoted cell may contain newlines: keep reading until quotes balance.
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record.rstrip("\r")]), [])
+        record = ""
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        if not any(values):
+            continue
+        yield {k: v for k, v in ((k, _csv_value(v)) for k, v in zip(header, values)) if v is not None}
+
+
+async def parse_ndjson(body: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    async for line in _lines(body):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield {"__error__": f"invalid JSON: {e}"}
+
+
+# ------------------------------------------
+# IMPORT - VALIDATE + WRITE
+# ------------------------------------------
+def _row_to_op(entity: BulkEntity, row: dict, tenant: Optional[str] = None):
+    raw_id = row.pop("id", None)
+    row_tenant = row.pop(TENANT_FIELD, None)
+    for f in entity.not_imported:
+        row.pop(f, None)
+    validated = entity.model.model_validate(row)
+    doc = validated.model_dump(by_alias=True, exclude={"id"}, exclude_unset=True)
+    defaults = {k: v for k, v in validated.model_dump(by_alias=True, exclude={"id"}).items() if k not in doc}
+    if entity.prepare:
+        entity.prepare(doc, defaults, row)
+
+    owner = doc.get(entity.tenant_from) if entity.tenant_from else None
+    if tenant is not None and owner is not None and owner != tenant:
+        raise ValueError(f"{entity.tenant_from} must be your own operator")
+    tenant = tenant if tenant is not None else (owner or row_tenant)
+    scope = {}
+    if tenant is not None:
+        doc[TENANT_FIELD] = tenant
+        scope[TENANT_FIELD] = tenant
+
+    on_insert = {**defaults, **{f: doc.pop(f) for f in entity.insert_only if f in doc}}
+    on_insert = {k: v for k, v in on_insert.items() if k not in doc}
+    if entity.key:
+        update = {"$set": doc}
+        if on_insert:
+            update["$setOnInsert"] = on_insert
+        return UpdateOne({entity.key: doc[entity.key], **scope}, update, upsert=True)
+    if raw_id:
+        if not ObjectId.is_valid(str(raw_id)):
+            raise ValueError(f"invalid id {raw_id!r}")
+        update = {"$set": doc}
+        if on_insert:
+            update["$setOnInsert"] = on_insert
+        # another tenant's _id fails as a duplicate key instead of being overwritten
+        return UpdateOne({"_id": ObjectId(str(raw_id)), **scope}, update, upsert=True)
+    return InsertOne({**on_insert, **doc})
+
+
+async def import_rows(entity: BulkEntity, collection, rows: AsyncIterator[dict], tenant: Optional[str] = None) -> dict:
+    """Validate and write rows chunk by chunk; returns counts and the first errors.
+
+    `tenant` scopes every row to one tenant (None = unscoped import).
+    """
+    result = {"rows": 0, "inserted": 0, "upserted": 0, "updated": 0, "failed": 0, "errors": []}
+
+    def fail(line: int, error: str):
+        result["failed"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append({"row": line, "error": error})
+
+    async def flush(ops, lines):
+        if not ops:
+            return
+        try:
+            res = await collection.bulk_write(ops, ordered=False)
+            counts = {"nInserted": res.inserted_count, "nUpserted": res.upserted_count,
+                      "nModified": res.modified_count}
+        except BulkWriteError as e:
+            counts = e.details
+            for err in e.details.get("writeErrors", []):
+                fail(lines[err["index"]], err.get("errmsg", "write failed"))
+        result["inserted"] += counts.get("nInserted", 0)
+        result["upserted"] += counts.get("nUpserted", 0)
+        result["updated"] += counts.get("nModified", 0)
+
+    ops, lines = [], []
+    async for row in rows:
+        result["rows"] += 1
+        try:
+            if "__error__" in row:
+                raise ValueError(row["__error__"])
+            ops.append(_row_to_op(entity, row, tenant))
+            lines.append(result["rows"])
+        except (ValidationError, ValueError, TypeError, KeyError) as e:
+            fail(result["rows"], str(e))
+            continue
+        if len(ops) >= CHUNK_ROWS:
+            await flush(ops, lines)
+            ops, lines = [], []
+    await flush(ops, lines)
+    return result
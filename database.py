@@ -4,6 +4,56 @@ from dotenv import load_dotenv
 
 load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
-client = AsyncIOMotorClient(MONGO_URI)
-db = client["air_ambulance"] 
-scheduling_collection = db["schedules"]
+DB_NAME = "air_ambulance"
+
+# ------------------------------------------
+# FORK-SAFE CLIENT
+# ------------------------------------------
+# PyMongo starts monitor threads as soon as a client is built, and those do
+# not survive fork(). With gunicorn --preload the app is imported in the
+# master, so the client is created lazily and re-created once per worker pid.
+_client = None
+_client_pid = None
+
+
+def get_client() -> AsyncIOMotorClient:
+    """Return the Motor client owned by the current process"""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        _client = AsyncIOMotorClient(MONGO_URI)
+        _client_pid = pid
+    return _client
+
+
+def close_client():
+    """Close this process' client (called on worker shutdown)"""
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = None
+    _client_pid = None
+
+
+class _LazyDatabase:
+    """Stand-in for `client[DB_NAME]` that resolves the client on each access"""
+
+    def __getattr__(self, name):
+        return getattr(get_client()[DB_NAME], name)
+
+    def __getitem__(self, name):
+        return get_client()[DB_NAME][name]
+
+
+class _LazyCollection:
+    """Stand-in for a single collection, resolved per process"""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_client()[DB_NAME][self._name], attr)
+
+
+db = _LazyDatabase()
+scheduling_collection = _LazyCollection("schedules")
@@ -0,0 +1,74 @@
+# gunicorn_conf.py
+"""
+Gunicorn deployment profile.
+
+    gunicorn -c gunicorn_conf.py app:app
+
+Every value can be overridden from the environment so Render (or any other
+host) can be tuned without a code change.
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# ------------------------------------------
+# WORKERS
+# ------------------------------------------
+# The app is async and I/O bound (Mongo), so one worker per core is enough;
+# extra workers mostly add memory and connection pools.
+cores = multiprocessing.cpu_count()
+workers_per_core = float(os.getenv("WORKERS_PER_CORE", "1"))
+max_workers = _env_int("MAX_WORKERS", 8)
+
+workers = _env_int("WEB_CONCURRENCY", max(2, min(max_workers, int(cores * workers_per_core))))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '10000')}")
+
+# ------------------------------------------
+# PROCESS LIFECYCLE
+# ------------------------------------------
+# --preload imports the app once in the master and forks it, so workers share
+# the imported code pages. database.get_client() is pid-aware, so no Mongo
+# client crosses the fork.
+preload_app = _env_bool("PRELOAD", True)
+
+# Recycle workers periodically; the jitter stops them all restarting at once.
+max_requests = _env_int("MAX_REQUESTS", 2000)
+max_requests_jitter = _env_int("MAX_REQUESTS_JITTER", 200)
+
+timeout = _env_int("TIMEOUT", 60)
+graceful_timeout = _env_int("GRACEFUL_TIMEOUT", 30)
+
+# ------------------------------------------
+# CONNECTIONS
+# ------------------------------------------
+# Keep-alive must outlive the load balancer's idle timeout, otherwise the
+# proxy reuses sockets we have already closed and clients see 502s.
+keepalive = _env_int("KEEPALIVE", 75)
+backlog = _env_int("BACKLOG", 2048)
+
+accesslog = os.getenv("ACCESS_LOG", "-") or None  # empty string disables
+errorlog = os.getenv("ERROR_LOG", "-")
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+# ------------------------------------------
+# HOOKS
+# ------------------------------------------
+def on_starting(server):
+    """Start every deploy with a fresh local shared-state store"""
+    from shared_state import reset_local_state
+    reset_local_state()
+
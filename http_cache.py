@@ -0,0 +1,194 @@
+# http_cache.py
+"""
+Conditional GET + compression for the list endpoints.
+
+Every router bumps a per-collection version counter (kept in shared_state so
+all workers agree) after it writes. A list response's ETag is a hash of the
+request URL and the versions of the collections it reads, so an unchanged
+poll is answered with 304 from the counters alone - Mongo is never queried.
+
+Counters are also kept per tenant (see repository.py), so one operator's
+writes don't invalidate every other operator's cached lists:
+
+  version:<c>             every write        (read by unscoped lists)
+  version:<c>@<tenant>    that tenant's writes
+  version:<c>@*           unscoped writes    (may touch any tenant)
+"""
+import gzip
+import hashlib
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, Iterable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter, ValidationError
+
+from shared_state import get_shared_state
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024  # bytes; below this compression costs more than it saves
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+EPOCH_KEY = "version:epoch"
+
+logger = logging.getLogger(__name__)
+
+
+def version_key(collection: str, tenant: Optional[str] = None) -> str:
+    if tenant is None:
+        return f"version:{collection}"
+    return f"version:{collection}@{tenant}"
+
+
+ANY_TENANT = "*"
+
+
+# ------------------------------------------
+# VERSION COUNTERS
+# ------------------------------------------
+async def bump_version(*collections: str, tenant: Optional[str] = None):
+    """Mark collections as changed; call after every successful write.
+
+    Pass the tenant the write was scoped to; None means the write was not
+    scoped, so every tenant's lists are treated as changed.
+    """
+    state = get_shared_state()
+    for collection in collections:
+        await state.incr(version_key(collection))
+        await state.incr(version_key(collection, tenant if tenant is not None else ANY_TENANT))
+
+
+async def _versions(collections: Iterable[str], tenant: Optional[str] = None) -> str:
+    state = get_shared_state()
+    keys = [EPOCH_KEY]
+    for c in collections:
+        if tenant is None:
+            keys.append(version_key(c))
+        else:
+            keys += [version_key(c, tenant), version_key(c, ANY_TENANT)]
+    values = await state.get_many(keys)
+    if values[EPOCH_KEY] is None:
+        # Counters restart from zero after a reset; the epoch keeps old ETags
+        # from a previous deploy from matching new data.
+        await state.add(EPOCH_KEY, uuid.uuid4().hex)
+        values[EPOCH_KEY] = await state.get(EPOCH_KEY)
+    return "|".join(f"{k}={values[k] or 0}" for k in keys)
+
+
+# ------------------------------------------
+# CONTENT NEGOTIATION
+# ------------------------------------------
+def _accepted_encodings(header: str) -> dict:
+    """Accept-Encoding -> {coding: q}; q=0 means the client refuses that coding"""
+    accepted = {}
+    for item in header.lower().split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def _pick_encoding(request: Request) -> str:
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    wildcard = accepted.get("*", 0.0)
+    # Preference order on a tie: br, gzip; a higher client q wins.
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = "identity", 0.0
+    for coding in candidates:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+# ------------------------------------------
+# RESPONSE HELPER
+# ------------------------------------------
+def _validate_list(adapter: TypeAdapter, docs: list, path: str):
+    """Validate a list of documents, leaving out (and logging) the ones that don't fit.
+
+    One malformed document must not turn a whole list endpoint into a 500.
+    Returns (validated, number skipped).
+    """
+    try:
+        return adapter.validate_python(docs), 0
+    except ValidationError as e:
+        bad = {err["loc"][0] for err in e.errors() if err["loc"] and isinstance(err["loc"][0], int)}
+        if not bad:
+            raise
+    for i in sorted(bad):
+        logger.warning("%s: skipping document %s that fails validation", path, docs[i].get("_id", i))
+    return adapter.validate_python([d for i, d in enumerate(docs) if i not in bad]), len(bad)
+
+
+async def conditional_json(
+    request: Request,
+    collections: Iterable[str],
+    load: Callable[[], Awaitable],
+    tenant: Optional[str] = None,
+    adapter: Optional[TypeAdapter] = None,
+) -> Response:
+    """
+    Return `await load()` as JSON with a strong ETag, or 304 if the client
+    already has it. `load` is only awaited when the data actually changed.
+    `tenant` is the scope `load` reads with (None = unscoped).
+
+    With an `adapter` (e.g. TypeAdapter(List[Model])) the raw documents are
+    validated and encoded by pydantic-core in one pass instead of going
+    through jsonable_encoder + json.dumps.
+    """
+    encoding = _pick_encoding(request)
+    fingerprint = f"{request.url.path}?{request.url.query}|{tenant}|{await _versions(collections, tenant)}"
+    digest = hashlib.sha1(fingerprint.encode()).hexdigest()
+    # Strong ETags are per representation, so the encoding is part of the tag.
+    etag = f'"{digest}-{encoding}"'
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if _matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    data = await load()
+    if adapter is not None:
+        validated, skipped = _validate_list(adapter, data, request.url.path)
+        if skipped:
+            headers["X-Skipped-Documents"] = str(skipped)
+        body = adapter.dump_json(validated, by_alias=True)
+    else:
+        body = json.dumps(jsonable_encoder(data), separators=(",", ":")).encode()
+    if encoding != "identity" and len(body) >= COMPRESS_MIN_SIZE:
+        body = _compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
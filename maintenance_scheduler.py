@@ -0,0 +1,291 @@
+# maintenance_scheduler.py
+"""
+Fleet-wide maintenance sweep.
+
+Maintenance records live inside each aircraft document. The sweeper keeps a
+min-heap of upcoming `next_due_date`s and sleeps until the earliest one (or
+until a route tells it something changed), then runs one indexed aggregation
+over the whole fleet and applies the availability changes with a single
+bulk_write:
+
+  * an open (not completed) record that is due  -> available=False, maintenance_hold=True
+  * maintenance_hold set but no open records left -> available=True,  maintenance_hold=False
+
+add-maintenance only holds the aircraft straight away when the new record
+has no due date or is already due; otherwise the hold starts at the due date.
+
+Every worker runs its own sweeper. A timed wake-up first takes a short
+lease in the shared state, so only one worker sweeps per due date. Sweeps
+are idempotent regardless: each update is guarded on the state it expects to
+change, and audit events / cache invalidations are issued only for the
+updates that were actually applied.
+"""
+import asyncio
+import heapq
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+
+from database import db
+from http_cache import bump_version
+from audit_log import audit_log
+from repository import TENANT_FIELD, TenantRepository
+from shared_state import get_shared_state
+
+logger = logging.getLogger(__name__)
+
+MAX_SLEEP_SECONDS = 3600     # safety net: re-read the fleet at least hourly
+RETRY_SECONDS = 30           # back-off after a failed sweep
+HEAP_PRELOAD_LIMIT = 256     # upcoming due dates loaded per refresh
+LEASE_KEY = "maintenance:sweep-lease"
+LEASE_SECONDS = 60           # expires on its own if the holder dies mid-sweep
+SWEEP_MARK = "maintenance_sweep_id"   # set by the updates of one sweep, to read back what applied
+
+
+def _open(record: str = "$$r"):
+    # Legacy {date, details} records have no type or status: history, never open.
+    return {"$and": [
+        {"$ne": [{"$ifNull": [f"{record}.maintenance_type", None]}, None]},
+        {"$ne": [f"{record}.status", "completed"]},
+    ]}
+
+
+def _due(now: datetime, record: str = "$$r"):
+    return {"$and": [
+        _open(record),
+        {"$ne": [{"$ifNull": [f"{record}.next_due_date", None]}, None]},
+        {"$lte": [f"{record}.next_due_date", now]},
+    ]}
+
+
+def _any(records_expr: dict) -> dict:
+    return {"$anyElementTrue": [{"$map": {
+        "input": {"$ifNull": ["$maintenance_records", []]},
+        "as": "r",
+        "in": records_expr,
+    }}]}
+
+
+async def ensure_indexes():
+    await db.aircrafts.create_index([("maintenance_records.next_due_date", ASCENDING)])
+    await db.aircrafts.create_index(
+        [("maintenance_hold", ASCENDING)],
+        partialFilterExpression={"maintenance_hold": True},
+    )
+
+
+# ------------------------------------------
+# QUERIES
+# ------------------------------------------
+async def upcoming_maintenance(days: int, now: Optional[datetime] = None, tenant: Optional[str] = None) -> List[dict]:
+    """Open maintenance due within `days` (overdue records included and flagged)"""
+    now = now or datetime.utcnow()
+    horizon = now + timedelta(days=days)
+    due_filter = {"status": {"$ne": "completed"}, "next_due_date": {"$lte": horizon}}
+    pipeline = [
+        {"$match": {"maintenance_records": {"$elemMatch": due_filter}}},
+        {"$unwind": "$maintenance_records"},
+        {"$match": {f"maintenance_records.{k}": v for k, v in due_filter.items()}},
+        {"$project": {
+            "_id": 0,
+            "aircraft_id": {"$toString": "$_id"},
+            "registration": 1,
+            "aircraft_type": 1,
+            "base_location": 1,
+            "available": 1,
+            "record_id": {"$toString": "$maintenance_records._id"},
+            "maintenance_type": "$maintenance_records.maintenance_type",
+            "status": "$maintenance_records.status",
+            "technician": "$maintenance_records.technician",
+            "next_due_date": "$maintenance_records.next_due_date",
+            "overdue": {"$lt": ["$maintenance_records.next_due_date", now]},
+        }},
+        {"$sort": {"next_due_date": 1}},
+    ]
+    aircrafts = TenantRepository(tenant).aircrafts
+    return [doc async for doc in aircrafts.aggregate(pipeline)]
+
+
+async def sweep(now: Optional[datetime] = None) -> dict:
+    """Apply due/completed maintenance to aircraft availability, fleet-wide"""
+    now = now or datetime.utcnow()
+    pipeline = [
+        {"$match": {"$or": [
+            {"maintenance_records": {"$elemMatch": {
+                "status": {"$ne": "completed"},
+                "next_due_date": {"$lte": now},
+            }}},
+            {"maintenance_hold": True},
+        ]}},
+        {"$project": {
+            "available": 1,
+            "maintenance_hold": 1,
+            TENANT_FIELD: 1,
+            "due": _any(_due(now)),
+            "open": _any(_open()),
+        }},
+    ]
+
+    sweep_id = ObjectId()
+    ops, ids = [], []
+    async for ac in db.aircrafts.aggregate(pipeline):
+        if ac["due"]:
+            if ac.get("available") is not False or not ac.get("maintenance_hold"):
+                # guarded: a concurrent sweep that already held it matches nothing
+                ops.append(UpdateOne(
+                    {"_id": ac["_id"], "$or": [{"available": {"$ne": False}}, {"maintenance_hold": {"$ne": True}}]},
+                    {"$set": {"available": False, "maintenance_hold": True, "updated_at": now, SWEEP_MARK: sweep_id}},
+                ))
+                ids.append(ac["_id"])
+        elif not ac["open"] and ac.get("maintenance_hold"):
+            ops.append(UpdateOne(
+                {"_id": ac["_id"], "maintenance_hold": True},
+                {"$set": {"available": True, "maintenance_hold": False, "updated_at": now, SWEEP_MARK: sweep_id}},
+            ))
+            ids.append(ac["_id"])
+
+    held = released = 0
+    if not ops:
+        return {"held": held, "released": released, "swept_at": now}
+
+    result = await db.aircrafts.bulk_write(ops, ordered=False)
+    tenants = set()
+    if result.modified_count:
+        # read back which updates this sweep applied (by _id, so it stays indexed)
+        applied = db.aircrafts.find(
+            {"_id": {"$in": ids}, SWEEP_MARK: sweep_id},
+            {"maintenance_hold": 1, TENANT_FIELD: 1},
+        )
+        async for ac in applied:
+            tenant = ac.get(TENANT_FIELD)
+            action = "maintenance_hold" if ac.get("maintenance_hold") else "maintenance_released"
+            audit_log.record("aircraft", ac["_id"], action, "system:maintenance-sweep", tenant=tenant)
+            tenants.add(tenant)
+            if ac.get("maintenance_hold"):
+                held += 1
+            else:
+                released += 1
+    # only the operators whose aircraft changed see their lists invalidated
+    for tenant in tenants:
+        await bump_version("aircrafts", tenant=tenant)
+    return {"held": held, "released": released, "swept_at": now}
+
+
+async def _acquire_lease() -> bool:
+    return await get_shared_state().add(LEASE_KEY, str(os.getpid()), ttl=LEASE_SECONDS)
+
+
+async def _release_lease():
+    await get_shared_state().delete(LEASE_KEY)
+
+
+async def _next_due_dates(now: datetime) -> List[datetime]:
+    pipeline = [
+        {"$match": {"maintenance_records": {"$elemMatch": {
+            "status": {"$ne": "completed"},
+            "next_due_date": {"$gt": now},
+        }}}},
+        {"$unwind": "$maintenance_records"},
+        {"$match": {
+            "maintenance_records.status": {"$ne": "completed"},
+            "maintenance_records.next_due_date": {"$gt": now},
+        }},
+        {"$sort": {"maintenance_records.next_due_date": 1}},
+        {"$limit": HEAP_PRELOAD_LIMIT},
+        {"$project": {"_id": 0, "due": "$maintenance_records.next_due_date"}},
+    ]
+    return [doc["due"] async for doc in db.aircrafts.aggregate(pipeline)]
+
+
+# ------------------------------------------
+# SCHEDULER
+# ------------------------------------------
+class MaintenanceSweeper:
+    def __init__(self):
+        self._heap: List[datetime] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.last_result: Optional[dict] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self, due: Optional[datetime] = None):
+        """Tell the sweeper about a new due date (None = re-check now)"""
+        due = due or datetime.utcnow()
+        if due.tzinfo is not None:
+            # the heap holds naive UTC, like everything stored in Mongo
+            due = due.astimezone(timezone.utc).replace(tzinfo=None)
+        heapq.heappush(self._heap, due)
+        self._wakeup.set()
+
+    async def _refresh(self, now: datetime):
+        upcoming = await _next_due_dates(now)
+        # a sorted list is a valid heap; the set drops dates we already knew
+        self._heap = sorted({d for d in self._heap if d > now}.union(upcoming))
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Sleep until the timeout or a notify(); True if woken by notify()"""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run(self):
+        indexed = False
+        woken = False    # not woken on the first pass: sweep once at start-up to catch anything missed while down
+        while True:
+            try:
+                now = datetime.utcnow()
+                # A timeout means the earliest due date (or the hourly safety net) was reached.
+                due_now = not woken or (bool(self._heap) and self._heap[0] <= now)
+                if not indexed:
+                    await ensure_indexes()
+                    indexed = True
+                if due_now:
+                    while self._heap and self._heap[0] <= now:
+                        heapq.heappop(self._heap)
+                    # Timed wake-ups happen on every worker at once; one sweep is enough.
+                    # A notify() comes from a write on this worker, so it always sweeps.
+                    if woken or await _acquire_lease():
+                        try:
+                            self.last_result = await sweep(now)
+                        finally:
+                            if not woken:
+                                await _release_lease()
+                    await self._refresh(now)
+
+                wait = MAX_SLEEP_SECONDS
+                if self._heap:
+                    wait = min(wait, (self._heap[0] - datetime.utcnow()).total_seconds())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Nothing here may end the task: a dead sweeper would also make every notify() pile up.
+                logger.exception("maintenance sweep failed")
+                self._heap = []   # rebuilt from Mongo by the next successful sweep
+                await self._sleep(RETRY_SECONDS)
+                woken = False     # retry as a full sweep
+                continue
+
+            woken = await self._sleep(wait) if wait > 0 else False
+
+
+maintenance_sweeper = MaintenanceSweeper()
@@ -1,45 +1,35 @@
 # models/aircraft.py
 
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+from typing import Optional, List, Union
 from datetime import datetime
 from bson import ObjectId
 
-# ------------------ ObjectId Support for Pydantic v2 ------------------ #
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+from models.common import PyObjectId, ObjectIdStr, UtcDatetime
 
-    @classmethod
-    def validate(cls, value):
-        if not ObjectId.is_valid(value):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(value)
 
-    @classmethod
-    def __get_pydantic_json_schema__(cls, schema, handler):
-        schema.update(type="string")
-        return schema
+# ------------------ Maintenance Record (as stored on the aircraft) ------------------ #
+class MaintenanceRecord(BaseModel):
+    id: PyObjectId = Field(default_factory=ObjectId, alias="_id")
+    maintenance_type: str
+    description: Optional[str] = None
+    last_maintenance_date: Optional[UtcDatetime] = None
+    next_due_date: Optional[UtcDatetime] = None
+    status: str = "scheduled"   # scheduled | in-progress | completed
+    technician: Optional[str] = None
 
+    model_config = ConfigDict(populate_by_name=True)
 
-# ------------------ Maintenance Record Schema ------------------ #
-class MaintenanceRecord(BaseModel):
-    date: datetime
+
+# Shape written by create-aircraft before records got ids/due dates. Still
+# accepted and returned as-is; the maintenance sweep ignores these (no due date).
+class LegacyMaintenanceRecord(BaseModel):
+    date: UtcDatetime
     details: str
     cost: Optional[float] = None
 
 
-# ------------------ Aircraft Model (MongoDB Document) ------------------ #
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
-from datetime import datetime
-
-
-# ------------------ Maintenance Record ------------------ #
-class MaintenanceRecord(BaseModel):
-    date: datetime
-    details: str
+StoredMaintenanceRecord = Union[MaintenanceRecord, LegacyMaintenanceRecord]
 
 
 # ------------------ Aircraft Model (Matches Your JSON) ------------------ #
@@ -60,26 +50,32 @@ class Aircraft(BaseModel):
 
     available: bool = True
 
-    last_maintenance_date: Optional[datetime] = None
-    
+    last_maintenance_date: Optional[UtcDatetime] = None
+
     image_url: Optional[str] = None
 
-    maintenance_records: List[MaintenanceRecord] = Field(default_factory=list)
+    maintenance_records: List[StoredMaintenanceRecord] = Field(default_factory=list)
 
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
-    model_config = ConfigDict(
-        populate_by_name=True,
-        arbitrary_types_allowed=True
-    )
-    
+    model_config = ConfigDict(populate_by_name=True)
+
 
+# ------------------ Aircraft Response ------------------ #
+class AircraftOut(Aircraft):
+    # Aircraft responses have always carried Mongo's "_id"
+    id: ObjectIdStr = Field(alias="_id")
+    maintenance_hold: bool = False
+    tenant: Optional[str] = None
+
+
+AircraftListAdapter = TypeAdapter(List[AircraftOut])
 
 
 # ------------------ Create Aircraft Schema ------------------ #
 class CreateAircraft(BaseModel):
-    id: str 
+    id: str
     aircraft_type: str
     registration: str
     airline_operator: str
@@ -110,9 +106,9 @@ class UpdateAircraft(BaseModel):
     medical_equipment_onboard: Optional[str] = None
 
     available: Optional[bool] = None
-    last_maintenance_date: Optional[datetime] = None
+    last_maintenance_date: Optional[UtcDatetime] = None
 
-    maintenance_records: Optional[List[MaintenanceRecord]] = None
+    maintenance_records: Optional[List[StoredMaintenanceRecord]] = None
 
 
 # ------------------ Add Single Maintenance Record Schema ------------------ #
@@ -121,12 +117,12 @@ class UpdateAircraft(BaseModel):
 class AddMaintenance(BaseModel):
     maintenance_type: str
     description: Optional[str] = None
-    last_maintenance_date: datetime
-    next_due_date: Optional[datetime] = None
+    last_maintenance_date: UtcDatetime
+    next_due_date: Optional[UtcDatetime] = None
     status: str = "scheduled"   # scheduled | in-progress | completed
     technician: Optional[str] = None
 # ------------------ Update Maintenance Status Schema ------------------ #
-    
+
 class UpdateMaintenanceStatus(BaseModel):
     status: str = Field(..., description="scheduled | in-progress | completed")
 
@@ -141,4 +137,4 @@ class UpdateMaintenanceStatus(BaseModel):
 
 
 
-    
+
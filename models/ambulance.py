@@ -1,15 +1,23 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import Optional, List
 
+from models.common import ObjectIdStr, document_id
+
 class MaintenanceRecord(BaseModel):
     date: str
     details: str
 
 class Ambulance(BaseModel):
-    id: Optional[str]
+    id: Optional[str] = None
     name: str
     type: str
     capacity: int
     maintenance_records: List[MaintenanceRecord] = Field(default_factory=list)
     available: bool = True
     last_maintenance_date: Optional[str] = None
+
+class AmbulanceOut(Ambulance):
+    id: ObjectIdStr = document_id()
+    tenant: Optional[str] = None
+
+AmbulanceListAdapter = TypeAdapter(List[AmbulanceOut])
@@ -0,0 +1,49 @@
+# models/common.py
+from pydantic import AfterValidator, AliasChoices, BeforeValidator, Field, PlainSerializer, PlainValidator, WithJsonSchema
+from typing import Annotated, Any
+from datetime import datetime, timezone
+from bson import ObjectId
+
+
+# ------------------ ObjectId types ------------------ #
+def _to_object_id(value: Any) -> ObjectId:
+    if isinstance(value, ObjectId):
+        return value
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    raise ValueError("Invalid ObjectId")
+
+
+def _object_id_to_str(value: Any) -> Any:
+    return str(value) if isinstance(value, ObjectId) else value
+
+
+# Stored as a real ObjectId; dumps as ObjectId in python mode (Mongo writes)
+# and as a hex string in JSON mode (responses).
+PyObjectId = Annotated[
+    ObjectId,
+    PlainValidator(_to_object_id),
+    PlainSerializer(str, return_type=str, when_used="json"),
+    WithJsonSchema({"type": "string", "examples": ["65f1c2a9e4b0a1b2c3d4e5f6"]}),
+]
+
+# Read side only: accepts an ObjectId (or string) and keeps it as a plain str,
+# which pydantic-core serializes without any Python callback.
+ObjectIdStr = Annotated[str, BeforeValidator(_object_id_to_str)]
+
+
+# ------------------ Datetimes ------------------ #
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Timestamps are stored naive-UTC everywhere (datetime.utcnow()); client
+# values with an offset ("...Z", "+05:30") are converted to match.
+UtcDatetime = Annotated[datetime, AfterValidator(_naive_utc)]
+
+
+def document_id(**kwargs):
+    """`id` field filled from Mongo's `_id` (or `id`), emitted as "id" """
+    return Field(validation_alias=AliasChoices("_id", "id"), **kwargs)
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional
-from datetime import date, time
+from datetime import date, time, datetime
+
+from models.common import ObjectIdStr, document_id
 
 class FlightRequest(BaseModel):
     requester: str
@@ -16,4 +18,26 @@ class FlightRequest(BaseModel):
     medical_staff: List[str]
     medicalEquipmentOnboard: str
     status: Optional[str] = "Pending"
-    special_instructions : Optional[str] = None
\ No newline at end of file
+    special_instructions : Optional[str] = None
+
+# Stored/returned shape: date + time are combined into flight_datetime
+class FlightRequestOut(BaseModel):
+    id: ObjectIdStr = document_id()
+    requester: str
+    from_location: dict
+    from_hospital: str
+    from_address: str
+    to_location: dict
+    to_hospital: str
+    to_address: str
+    flight_datetime: Optional[datetime] = None
+    route: str
+    medical_staff: List[str]
+    medicalEquipmentOnboard: str
+    status: Optional[str] = "Pending"
+    special_instructions: Optional[str] = None
+    approved_by: Optional[str] = None
+    approved_at: Optional[datetime] = None
+    tenant: Optional[str] = None
+
+FlightRequestListAdapter = TypeAdapter(List[FlightRequestOut])
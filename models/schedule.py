@@ -1,8 +1,19 @@
 # models/schedule.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List, Optional
 from datetime import datetime
 
+from models.common import ObjectIdStr, document_id
+
+# Allowed status transitions (small state-machine); the keys are every valid status
+VALID_TRANSITIONS = {
+    "Scheduled": ["Dispatched", "Cancelled"],
+    "Dispatched": ["In-Transit", "Cancelled"],
+    "In-Transit": ["Completed"],
+    "Completed": [],
+    "Cancelled": []
+}
+
 class ETAInfo(BaseModel):
     eta_utc: Optional[datetime] = None     # computed ETA in UTC
     estimated_duration_minutes: Optional[int] = None
@@ -23,11 +34,14 @@ class ScheduleCreate(ScheduleBase):
     pass
 
 class ScheduleOut(ScheduleBase):
-    id: Optional[str]
+    id: ObjectIdStr = document_id()
     status: str                                      # Scheduled, En Route, In Transit, Completed, Cancelled
     eta: Optional[ETAInfo] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    tenant: Optional[str] = None
+
+ScheduleListAdapter = TypeAdapter(List[ScheduleOut])
 
 class UpdateETA(BaseModel):
     eta_utc: datetime
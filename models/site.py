@@ -0,0 +1,15 @@
+# models/site.py
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import List, Optional
+
+# ------------------ Site (hospital / airport / helipad) ------------------ #
+class Site(BaseModel):
+    code: str                                   # "COK", "KMCH-CBE"
+    name: str                                   # "Kovai Medical Center"
+    kind: str = "hospital"                      # hospital | airport | helipad
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    can_refuel: bool = False                    # usable as a refuelling stop
+    address: Optional[str] = None
+
+SiteListAdapter = TypeAdapter(List[Site])
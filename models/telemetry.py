@@ -0,0 +1,21 @@
+# models/telemetry.py
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import List, Optional
+
+from models.common import PyObjectId, UtcDatetime
+
+
+# ------------------ Position Report (one fix from one aircraft) ------------------ #
+class PositionReport(BaseModel):
+    schedule_id: PyObjectId                     # the flight the aircraft is flying
+    aircraft: Optional[str] = None              # registration, "VT-ABC"
+    ts: UtcDatetime                             # time of the fix
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    altitude_m: Optional[float] = None
+    ground_speed_kmh: Optional[float] = Field(default=None, ge=0)
+    heading_deg: Optional[float] = Field(default=None, ge=0, lt=360)
+
+
+# Request bodies / WebSocket frames are JSON arrays of reports
+PositionBatchAdapter = TypeAdapter(List[PositionReport])
@@ -6,6 +6,7 @@ class UserRegister(BaseModel):
     email: EmailStr
     password: str
     role: str  # superadmin, dispatcher, medical_staff
+    operator: Optional[str] = None  # tenant; None = platform-wide user
 
 # For Login (role optional)
 class UserLogin(BaseModel):
@@ -14,6 +15,7 @@ class UserLogin(BaseModel):
 
 # Response model
 class UserOut(BaseModel):
-    id: Optional[str]
+    id: Optional[str] = None
     email: EmailStr
     role: str
+    operator: Optional[str] = None
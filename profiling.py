@@ -0,0 +1,260 @@
+# profiling.py
+"""
+Production profiling hooks (per worker, superadmin-only routes in
+routes/admin_routes.py).
+
+  * SamplingProfiler - on demand, samples every thread's stack at a fixed
+    interval for N seconds and returns flamegraph-compatible collapsed stacks
+    ("frame;frame;frame count" per line). Costs nothing while not running.
+  * SlowRequestMiddleware - times every request; requests over the threshold
+    are kept (with their Mongo commands, timings and payload sizes) in a
+    bounded ring buffer. Fast requests cost two perf_counter() calls.
+  * LoopLagMonitor - a heartbeat task plus a watchdog thread; when the event
+    loop stops answering for longer than the threshold, the watchdog grabs the
+    loop thread's stack, which names the blocking call (e.g. bcrypt in
+    utils.verify_password).
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Optional
+
+from pymongo import monitoring
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_BUFFER = int(os.getenv("SLOW_REQUEST_BUFFER", "200"))
+MAX_COMMANDS_PER_REQUEST = 100
+LOOP_LAG_MS = float(os.getenv("LOOP_LAG_MS", "100"))
+LOOP_LAG_BUFFER = int(os.getenv("LOOP_LAG_BUFFER", "200"))
+CAPTURE_MONGO = os.getenv("PROFILE_MONGO_COMMANDS", "true").lower() in ("1", "true", "yes")
+
+# Per-request capture state; Motor copies the context into its executor
+# threads, so the command listener sees the request it is working for.
+_current_request: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("profiling_request", default=None)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _stack(frame, limit: int = 128):
+    stack = []
+    while frame is not None and len(stack) < limit:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+# ------------------------------------------
+# SAMPLING PROFILER
+# ------------------------------------------
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+
+    def _sample(self, seconds: float, interval: float, counts: Counter, only_thread: Optional[int]):
+        me = threading.get_ident()
+        names = {}
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me or (only_thread is not None and thread_id != only_thread):
+                    continue
+                name = names.get(thread_id)
+                if name is None:
+                    thread = threading._active.get(thread_id)
+                    name = names[thread_id] = (thread.name if thread else f"thread-{thread_id}").replace(" ", "_")
+                counts[";".join([name] + _stack(frame))] += 1
+            time.sleep(interval)
+
+    async def profile(self, seconds: float, interval: float, all_threads: bool = False) -> str:
+        """Sample this worker for `seconds`; returns collapsed stacks.
+
+        By default only the event loop thread (where the handlers run) is
+        sampled; `all_threads` adds Motor's executor and pymongo's threads.
+        """
+        only_thread = None if all_threads else threading.get_ident()
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running in this worker")
+        self.running = True
+        try:
+            counts = Counter()
+            # The sampler runs in its own thread so it also sees the event loop
+            # thread while that one is busy serving requests.
+            await asyncio.to_thread(self._sample, seconds, interval, counts, only_thread)
+            return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+        finally:
+            self.running = False
+            self._lock.release()
+
+
+# ------------------------------------------
+# MONGO COMMAND CAPTURE
+# ------------------------------------------
+class _CommandListener(monitoring.CommandListener):
+    def started(self, event):
+        req = _current_request.get()
+        if req is not None:
+            target = event.command.get(event.command_name)
+            req["pending"][event.request_id] = target if isinstance(target, str) else None
+
+    def _finish(self, event, ok: bool):
+        req = _current_request.get()
+        if req is None:
+            return
+        collection = req["pending"].pop(event.request_id, None)
+        req["command_count"] += 1
+        req["mongo_ms"] += event.duration_micros / 1000
+        if len(req["commands"]) < MAX_COMMANDS_PER_REQUEST:
+            req["commands"].append({
+                "command": event.command_name,
+                "collection": collection,
+                "duration_ms": round(event.duration_micros / 1000, 3),
+                "ok": ok,
+            })
+
+    def succeeded(self, event):
+        self._finish(event, True)
+
+    def failed(self, event):
+        self._finish(event, False)
+
+
+if CAPTURE_MONGO:
+    # Must happen before the first MongoClient is built; database.get_client()
+    # is lazy, so importing this module from app.py is early enough.
+    monitoring.register(_CommandListener())
+
+
+# ------------------------------------------
+# SLOW REQUEST CAPTURE
+# ------------------------------------------
+slow_requests = deque(maxlen=SLOW_REQUEST_BUFFER)
+
+
+class SlowRequestMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead, streaming-safe)"""
+
+    def __init__(self, app, threshold_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.threshold_ms = threshold_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        req = {"pending": {}, "commands": [], "command_count": 0, "mongo_ms": 0.0,
+               "request_bytes": 0, "response_bytes": 0, "status": None}
+        token = _current_request.set(req)
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                req["request_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                req["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                req["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _current_request.reset(token)
+            if elapsed_ms >= self.threshold_ms:
+                slow_requests.append({
+                    "at": datetime.utcnow(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status": req["status"],
+                    "duration_ms": round(elapsed_ms, 2),
+                    "mongo_ms": round(req["mongo_ms"], 2),
+                    "mongo_command_count": req["command_count"],
+                    "mongo_commands": req["commands"],
+                    "request_bytes": req["request_bytes"],
+                    "response_bytes": req["response_bytes"],
+                })
+
+
+# ------------------------------------------
+# EVENT LOOP LAG MONITOR
+# ------------------------------------------
+class LoopLagMonitor:
+    def __init__(self, threshold_ms: float = LOOP_LAG_MS):
+        self.threshold = threshold_ms / 1000
+        self.events = deque(maxlen=LOOP_LAG_BUFFER)
+        self.max_lag_ms = 0.0
+        self._beat = time.monotonic()
+        self._loop_thread_id = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watchdog, name="loop-lag-watchdog", daemon=True).start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _heartbeat(self):
+        interval = self.threshold / 4
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self._beat = now
+            self.max_lag_ms = max(self.max_lag_ms, (now - expected) * 1000)
+
+    def _watchdog(self):
+        # Poll faster than the threshold; report each stall once, with the stack
+        # the loop thread was stuck in when the stall was noticed.
+        reported_beat = None
+        while not self._stop.wait(self.threshold / 4):
+            beat = self._beat
+            stalled = time.monotonic() - beat
+            if stalled < self.threshold or beat == reported_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            reported_beat = beat
+            self.events.append({
+                "at": datetime.utcnow(),
+                "stalled_ms_when_seen": round(stalled * 1000, 1),
+                "stack": _stack(frame) if frame is not None else [],
+            })
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag_ms, 2),
+            "stalls": list(self.events),
+        }
+
+
+sampling_profiler = SamplingProfiler()
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,207 @@
+# query_cache.py
+"""
+Bounded, per-worker LRU cache for documents fetched by _id.
+
+Entries are tagged with a per-document version counter kept in shared_state.
+A lookup costs one shared-state read instead of a Mongo round trip; when any
+worker writes the document it bumps that counter, so every other worker's copy
+is treated as stale and re-read. The writing worker stores the new document
+directly (write-through), so its next read is a hit:
+
+    before = await cache.version(key)        # before the Mongo write
+    doc = await collection.find_one_and_update(..., return_document=AFTER)
+    await cache.put(key, doc, before, tenant)
+
+put() only keeps the document when its bump is the first since `before`;
+if anyone else wrote in between, its copy may be the older one and is dropped.
+
+Concurrent misses for the same _id share a single Mongo read (single-flight).
+
+Entries are partitioned per tenant (see repository.py): a tenant only ever
+hits documents it loaded through its own scope. When the cache is full the
+largest partition gives up its least recently used entry, so a busy tenant
+can't push the others out - partitions converge to equal shares. Finding the
+largest partition is O(1) (partitions are bucketed by size), so lookups and
+evictions cost the same however many tenants there are.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from shared_state import get_shared_state
+
+
+class AsyncLRUCache:
+    def __init__(self, name: str, max_size: int = 2048):
+        self.name = name
+        self.max_size = max_size
+        self._partitions: Dict[Optional[str], OrderedDict] = {}  # tenant -> key -> (version, doc)
+        self._by_size: Dict[int, Set[Optional[str]]] = {}        # partition size -> tenants
+        self._largest = 0
+        self._size = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}      # (tenant, key) -> Future
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _version_key(self, key: str) -> str:
+        return f"doc:{self.name}:{key}"
+
+    @property
+    def _generation_key(self) -> str:
+        return f"doc:{self.name}:*generation"
+
+    async def _version(self, key: str):
+        state = get_shared_state()
+        values = await state.get_many([self._generation_key, self._version_key(key)])
+        return values[self._generation_key], values[self._version_key(key)]
+
+    # ---------------- partitions ---------------- #
+    def _resized(self, tenant: Optional[str], old: int, new: int):
+        """Move a partition between size buckets after it grew or shrank by one"""
+        if old:
+            bucket = self._by_size[old]
+            bucket.discard(tenant)
+            if not bucket:
+                del self._by_size[old]
+                if old == self._largest and new < old:
+                    self._largest = new
+        if new:
+            self._by_size.setdefault(new, set()).add(tenant)
+            self._largest = max(self._largest, new)
+        else:
+            del self._partitions[tenant]
+        self._size += new - old
+
+    def _pop(self, tenant: Optional[str], key: str):
+        part = self._partitions.get(tenant)
+        if part is not None and key in part:
+            del part[key]
+            self._resized(tenant, len(part) + 1, len(part))
+
+    def _store(self, tenant: Optional[str], key: str, version, doc):
+        part = self._partitions.get(tenant)
+        if part is None:
+            part = self._partitions[tenant] = OrderedDict()
+        grew = key not in part
+        part[key] = (version, doc)
+        part.move_to_end(key)
+        if grew:
+            self._resized(tenant, len(part) - 1, len(part))
+        while self._size > self.max_size:
+            # Fair eviction: the LRU entry of (one of) the largest partitions
+            victim = next(iter(self._by_size[self._largest]))
+            victim_part = self._partitions[victim]
+            victim_part.popitem(last=False)
+            self._resized(victim, len(victim_part) + 1, len(victim_part))
+            self.evictions += 1
+
+    # ---------------- public API ---------------- #
+    async def get(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[Optional[dict]]],
+        tenant: Optional[str] = None,
+    ) -> Optional[dict]:
+        """Return a shallow copy of the cached doc, calling `load` on a miss.
+
+        `tenant` must be the scope `load` reads with (None = unscoped).
+        """
+        version = await self._version(key)
+        part = self._partitions.get(tenant)
+        entry = part.get(key) if part is not None else None
+        if entry is not None:
+            if entry[0] == version:
+                self.hits += 1
+                part.move_to_end(key)
+                return dict(entry[1])
+            self.stale += 1
+            self._pop(tenant, key)
+
+        flight_key = (tenant, key)
+        pending = self._inflight.get(flight_key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                doc = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                doc = await load()  # the leading request was cancelled; read ourselves
+            return dict(doc) if doc is not None else None
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[flight_key] = future
+        try:
+            doc = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(flight_key, None)
+        future.set_result(doc)
+        # Missing documents are not cached; a 404 must not outlive a later insert.
+        if doc is not None:
+            self._store(tenant, key, version, doc)
+            return dict(doc)
+        return None
+
+    async def version(self, key: str):
+        """Current version of `key`; read it before the database write and pass it to put()"""
+        return await self._version(key)
+
+    async def put(self, key: str, doc: Optional[dict], before, tenant: Optional[str] = None):
+        """Write-through after a successful update; pass None if the doc is gone.
+
+        `before` is version(key) read before the write. The doc is cached only
+        if incr() returns exactly the version after `before`: any other write
+        (or invalidate) that committed meanwhile may be newer than ours, so
+        then the entry is just dropped. Copies in other tenants' partitions
+        (and other workers) go stale through the version bump.
+        """
+        generation, version = before
+        bumped = await get_shared_state().incr(self._version_key(key))
+        if doc is None or bumped != int(version or 0) + 1:
+            self._pop(tenant, key)
+        else:
+            # a generation bump since `before` only makes the entry look stale
+            self._store(tenant, key, (generation, str(bumped)), doc)
+
+    async def invalidate(self, key: str, tenant: Optional[str] = None):
+        """Drop the doc on every worker (use when the new value isn't at hand)"""
+        await get_shared_state().incr(self._version_key(key))
+        self._pop(tenant, key)
+
+    async def invalidate_all(self):
+        """Drop every cached doc on every worker (bulk writes)"""
+        await get_shared_state().incr(self._generation_key)
+        self._partitions.clear()
+        self._by_size.clear()
+        self._largest = 0
+        self._size = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": self._size,
+            "max_size": self.max_size,
+            "tenants": len(self._partitions),
+            "largest_partition": self._largest,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+schedule_cache = AsyncLRUCache("schedules", max_size=4096)
+flight_request_cache = AsyncLRUCache("flight_requests", max_size=4096)
@@ -0,0 +1,267 @@
+# repository.py
+"""
+Tenant-scoped data access.
+
+Each operator is a tenant. /api/auth/login puts the user's `operator` in the
+JWT, and `tenant_repository(token_data)` returns a view of the database in
+which every collection adds `{"tenant": <operator>}` to each filter (and
+stamps it on each inserted document):
+
+    repo = tenant_repository(token_data)
+    await repo.aircrafts.find_one({"_id": oid})
+
+With the compound indexes below - all led by the tenant key - a query only
+walks its own operator's slice of the index, so its cost does not grow with
+the number of other operators.
+
+Tokens without an operator claim (platform superadmins, tokens issued before
+tenancy) are unscoped and keep seeing every tenant's documents. Requests
+without a valid token (the public list/detail routes) get the ANONYMOUS
+scope: only documents that belong to no tenant. Only a superadmin can give a
+user an operator (see /api/auth/register).
+
+Ownership:
+  * aircrafts       - the `airline_operator` (set on create/import).
+  * flight_requests - filed by an operator user: that operator. Filed by a
+                      user without one (hospitals): unclaimed, and visible to
+                      every operator until one schedules it (or approves it),
+                      which claims it. See SHARED_UNTIL_CLAIMED.
+  * schedules       - always the tenant of their flight request.
+  * ambulances      - the creating superadmin's operator, if they have one.
+                      Otherwise (and for all from before tenancy) a shared
+                      ground pool every operator sees; there is no owner
+                      field to derive one from, so they are never claimed.
+
+Documents written before tenancy get their tenant from `backfill_tenants()`,
+started by every worker at start-up; a shared-state lease lets only one of
+them run it, and it only touches documents without a tenant.
+"""
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateMany, UpdateOne
+
+from database import db
+from http_cache import bump_version
+from query_cache import schedule_cache, flight_request_cache
+from shared_state import get_shared_state
+
+logger = logging.getLogger(__name__)
+
+TENANT_FIELD = "tenant"
+TENANT_CLAIM = "operator"
+
+# Scope of requests without a (valid) token: tenant-less documents only
+ANONYMOUS = "*anonymous"
+
+# Collections whose unclaimed (tenant-less) documents every tenant can see
+SHARED_UNTIL_CLAIMED = {"flight_requests", "ambulances"}
+BACKFILL_BATCH = 1000
+BACKFILL_LEASE_KEY = "tenants:backfill-lease"
+BACKFILL_LEASE_SECONDS = 600   # expires on its own if the worker dies mid-backfill
+
+# Compound indexes for the tenant-owned collections (tenant key first)
+TENANT_INDEXES = {
+    "aircrafts": [
+        [("available", ASCENDING)],
+        [("registration", ASCENDING)],
+        [("maintenance_records.next_due_date", ASCENDING)],
+    ],
+    "ambulances": [
+        [("available", ASCENDING)],
+        [("name", ASCENDING)],
+    ],
+    "flight_requests": [
+        [("status", ASCENDING)],
+    ],
+    "schedules": [
+        [("status", ASCENDING)],
+        [("flight_request_id", ASCENDING)],
+        [("updated_at", DESCENDING)],
+    ],
+}
+
+
+def tenant_of(token_data: Optional[dict]) -> Optional[str]:
+    """Tenant from decoded JWT claims; None = unscoped, no claims at all = ANONYMOUS"""
+    if token_data is None:
+        return ANONYMOUS
+    return token_data.get(TENANT_CLAIM) or None
+
+
+async def ensure_tenant_indexes():
+    try:
+        for collection, indexes in TENANT_INDEXES.items():
+            for keys in indexes:
+                await db[collection].create_index([(TENANT_FIELD, ASCENDING)] + keys)
+        await backfill_tenants()
+    except Exception:
+        logger.exception("could not prepare tenant indexes / backfill")
+
+
+# ------------------------------------------
+# BACKFILL (documents from before tenancy)
+# ------------------------------------------
+async def _bulk_update(collection, ops: List[UpdateOne | UpdateMany]) -> int:
+    modified = 0
+    for start in range(0, len(ops), BACKFILL_BATCH):
+        result = await collection.bulk_write(ops[start:start + BACKFILL_BATCH], ordered=False)
+        modified += result.modified_count
+    return modified
+
+
+async def backfill_tenants() -> Optional[Dict[str, int]]:
+    """Give tenant-less documents their owner's tenant; safe to re-run.
+
+    aircrafts get their airline_operator; flight requests the requester's
+    operator, else the operator of whoever scheduled them (the rest stay
+    unclaimed); schedules their flight request's tenant. Ambulances have no
+    owner to derive and stay in the shared pool. Returns None if another
+    worker holds the lease.
+    """
+    state = get_shared_state()
+    if not await state.add(BACKFILL_LEASE_KEY, str(os.getpid()), ttl=BACKFILL_LEASE_SECONDS):
+        return None
+    try:
+        return await _backfill()
+    finally:
+        await state.delete(BACKFILL_LEASE_KEY)
+
+
+async def _backfill() -> Dict[str, int]:
+    missing = {TENANT_FIELD: None}
+    counts = {}
+
+    result = await db.aircrafts.update_many(
+        {**missing, "airline_operator": {"$nin": [None, ""]}},
+        [{"$set": {TENANT_FIELD: "$airline_operator"}}],
+    )
+    counts["aircrafts"] = result.modified_count
+
+    operators = {
+        u["email"]: u[TENANT_CLAIM]
+        async for u in db.users.find({TENANT_CLAIM: {"$nin": [None, ""]}}, {"email": 1, TENANT_CLAIM: 1})
+    }
+    # a request can have several schedules (cancelled and re-scheduled)
+    scheduled_by = defaultdict(list)
+    async for s in db.schedules.find(missing, {"flight_request_id": 1, "scheduled_by": 1}):
+        scheduled_by[s.get("flight_request_id")].append(s.get("scheduled_by"))
+    ops = []
+    async for fr in db.flight_requests.find(missing, {"requester": 1}):
+        owner = operators.get(fr.get("requester")) or next(
+            (operators[e] for e in scheduled_by.get(str(fr["_id"]), []) if e in operators), None
+        )
+        if owner:
+            ops.append(UpdateOne({"_id": fr["_id"], **missing}, {"$set": {TENANT_FIELD: owner}}))
+    counts["flight_requests"] = await _bulk_update(db.flight_requests, ops)
+
+    fr_ids = [ObjectId(i) for i in scheduled_by if isinstance(i, str) and ObjectId.is_valid(i)]
+    fr_tenants = {}
+    for start in range(0, len(fr_ids), BACKFILL_BATCH):
+        query = {"_id": {"$in": fr_ids[start:start + BACKFILL_BATCH]}, TENANT_FIELD: {"$ne": None}}
+        async for fr in db.flight_requests.find(query, {TENANT_FIELD: 1}):
+            fr_tenants[str(fr["_id"])] = fr[TENANT_FIELD]
+    ops = [
+        UpdateMany({"flight_request_id": fr_id, **missing}, {"$set": {TENANT_FIELD: tenant}})
+        for fr_id, tenant in fr_tenants.items()
+    ]
+    counts["schedules"] = await _bulk_update(db.schedules, ops)
+
+    changed = [c for c, n in counts.items() if n]
+    if changed:
+        logger.info("tenant backfill: %s", counts)
+        # documents moved between tenants' views: drop cached lists and lookups everywhere
+        await bump_version(*changed)
+        await schedule_cache.invalidate_all()
+        await flight_request_cache.invalidate_all()
+    return counts
+
+
+class ScopedCollection:
+    """Motor collection wrapper that confines every operation to one tenant
+
+    With `shared=True` (SHARED_UNTIL_CLAIMED) unclaimed documents match too.
+    """
+
+    __slots__ = ("collection", "tenant", "shared")
+
+    def __init__(self, collection, tenant: Optional[str], shared: bool = False):
+        self.collection = collection
+        self.tenant = tenant
+        self.shared = shared
+
+    def _match(self):
+        if self.tenant == ANONYMOUS:
+            return None
+        return {"$in": [self.tenant, None]} if self.shared else self.tenant
+
+    def scope(self, filter: Optional[dict] = None) -> dict:
+        filter = dict(filter or {})
+        if self.tenant is not None:
+            filter[TENANT_FIELD] = self._match()
+        return filter
+
+    def stamp(self, doc: dict) -> dict:
+        if self.tenant == ANONYMOUS:
+            raise PermissionError("anonymous requests cannot write")
+        if self.tenant is not None:
+            doc[TENANT_FIELD] = self.tenant
+        return doc
+
+    # ---------------- reads ---------------- #
+    def find(self, filter: Optional[dict] = None, *args, **kwargs):
+        return self.collection.find(self.scope(filter), *args, **kwargs)
+
+    async def find_one(self, filter: Optional[dict] = None, *args, **kwargs):
+        return await self.collection.find_one(self.scope(filter), *args, **kwargs)
+
+    async def count_documents(self, filter: Optional[dict] = None, **kwargs):
+        return await self.collection.count_documents(self.scope(filter), **kwargs)
+
+    def aggregate(self, pipeline: list, **kwargs):
+        if self.tenant is not None:
+            pipeline = [{"$match": {TENANT_FIELD: self._match()}}] + list(pipeline)
+        return self.collection.aggregate(pipeline, **kwargs)
+
+    # ---------------- writes ---------------- #
+    async def insert_one(self, doc: dict, **kwargs):
+        return await self.collection.insert_one(self.stamp(doc), **kwargs)
+
+    async def update_one(self, filter: dict, update: dict, **kwargs):
+        # An upsert copies the tenant from the equality filter into the new doc
+        # (not for shared collections - stamp the update there).
+        return await self.collection.update_one(self.scope(filter), update, **kwargs)
+
+    async def update_many(self, filter: dict, update: dict, **kwargs):
+        return await self.collection.update_many(self.scope(filter), update, **kwargs)
+
+    async def find_one_and_update(self, filter: dict, update: dict, **kwargs):
+        return await self.collection.find_one_and_update(self.scope(filter), update, **kwargs)
+
+    async def delete_one(self, filter: dict, **kwargs):
+        return await self.collection.delete_one(self.scope(filter), **kwargs)
+
+    async def find_one_and_delete(self, filter: dict, **kwargs):
+        return await self.collection.find_one_and_delete(self.scope(filter), **kwargs)
+
+
+class TenantRepository:
+    """`db`-like access where `repo.<collection>` is a ScopedCollection"""
+
+    def __init__(self, tenant: Optional[str]):
+        self.tenant = tenant
+
+    def __getattr__(self, name: str) -> ScopedCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> ScopedCollection:
+        return ScopedCollection(db[name], self.tenant, shared=name in SHARED_UNTIL_CLAIMED)
+
+
+def tenant_repository(token_data: Optional[dict]) -> TenantRepository:
+    return TenantRepository(tenant_of(token_data))
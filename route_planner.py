@@ -0,0 +1,232 @@
+# route_planner.py
+"""
+Site-to-site distances and multi-leg route planning.
+
+All registered sites (hospitals, airports, helipads) get a dense N x N
+great-circle distance matrix, built once with vectorized NumPy haversine and
+saved as a .npy file that every worker opens with mmap_mode="r". The OS page
+cache holds one copy for the whole host, and any pair is an O(1) lookup.
+Flight time for an aircraft is `distance / speed_kmh`, so the same matrix
+serves every aircraft type.
+
+The matrix file is named after a hash of the site list, so workers that see
+the same registry share the same file and a registry change simply produces
+a new one. Each load touches the current file; files that have not been
+current for MATRIX_GRACE_SECONDS are deleted (a worker that still has an old
+one mapped keeps its pages until it reloads).
+
+Routing is A* over the matrix: intermediate nodes are refuelling sites, an
+edge exists when the leg fits inside the aircraft's usable range, and the
+cost is flight minutes plus a fixed turnaround per refuelling stop. The
+straight-line time to the destination is the (admissible) heuristic.
+"""
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database import db
+from shared_state import get_shared_state
+from http_cache import version_key
+
+EARTH_RADIUS_KM = 6371.0088
+RESERVE_FRACTION = 0.10        # keep 10% of range as fuel reserve on every leg
+REFUEL_STOP_MINUTES = 30       # landing, refuelling and departure at a stop
+BUILD_CHUNK_ROWS = 512         # rows computed per NumPy pass while building
+
+MATRIX_DIR = os.getenv("ROUTE_MATRIX_DIR") or os.path.join(tempfile.gettempdir(), "air_ambulance_routes")
+MATRIX_GRACE_SECONDS = 600     # how long a superseded matrix file is kept for slower workers
+SITES_VERSION_KEY = version_key("sites")   # bumped by the site registry routes
+
+
+logger = logging.getLogger(__name__)
+
+
+class NoRouteError(Exception):
+    pass
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; degrees in, scalars or NumPy arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def build_distance_matrix(lat_deg: np.ndarray, lon_deg: np.ndarray, path: str):
+    """Write the haversine distance matrix (km, float32) to `path` as .npy"""
+    n = len(lat_deg)
+    lat = np.radians(lat_deg.astype(np.float64))
+    lon = np.radians(lon_deg.astype(np.float64))
+    cos_lat = np.cos(lat)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(n, n))
+    # Row chunks keep peak memory at a few chunk x N temporaries, not N x N.
+    for start in range(0, n, BUILD_CHUNK_ROWS):
+        stop = min(start + BUILD_CHUNK_ROWS, n)
+        dlat = lat[start:stop, None] - lat[None, :]
+        dlon = lon[start:stop, None] - lon[None, :]
+        a = np.sin(dlat / 2) ** 2 + cos_lat[start:stop, None] * cos_lat[None, :] * np.sin(dlon / 2) ** 2
+        out[start:stop] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    out.flush()
+    del out
+    os.replace(tmp_path, path)  # atomic: other workers never see a half-written file
+
+
+def prune_matrix_files(current: Optional[str], grace_seconds: float = MATRIX_GRACE_SECONDS):
+    """Delete matrix files (and abandoned partial builds) unused for `grace_seconds`"""
+    cutoff = time.time() - grace_seconds
+    for path in glob.glob(os.path.join(MATRIX_DIR, "distances_*.npy*")):
+        if path == current:
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass  # another worker pruned it first
+        except OSError:
+            logger.warning("could not remove stale route matrix %s", path, exc_info=True)
+
+
+class RoutePlanner:
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._version = object()   # forces a load on first use
+        self.sites: List[dict] = []
+        self.index: Dict[str, int] = {}
+        self.refuel_mask: Optional[np.ndarray] = None
+        self.distances: Optional[np.ndarray] = None
+
+    # ---------------- loading ---------------- #
+    async def ensure_current(self):
+        """Reload the registry/matrix if any worker changed the sites since last time"""
+        version = await get_shared_state().get(SITES_VERSION_KEY)
+        if version == self._version:
+            return
+        async with self._lock:
+            if version == self._version:
+                return
+            sites = [s async for s in db.sites.find({}, {"_id": 0}).sort("code", 1)]
+            # Build/open off the event loop, then swap everything in at once.
+            loaded = await asyncio.to_thread(self._load, sites)
+            self.sites, self.index, self.refuel_mask, self.distances, path = loaded
+            self._version = version
+            await asyncio.to_thread(prune_matrix_files, path)
+
+    @staticmethod
+    def _load(sites: List[dict]):
+        fingerprint = hashlib.sha1(
+            "|".join(f"{s['code']},{s['latitude']:.6f},{s['longitude']:.6f}" for s in sites).encode()
+        ).hexdigest()[:16]
+        path = os.path.join(MATRIX_DIR, f"distances_{fingerprint}.npy")
+        if sites and not os.path.exists(path):
+            build_distance_matrix(
+                np.array([s["latitude"] for s in sites]),
+                np.array([s["longitude"] for s in sites]),
+                path,
+            )
+        elif sites:
+            os.utime(path)  # still current: keep it out of every worker's prune
+
+        index = {}
+        for i, s in enumerate(sites):
+            index[s["code"].upper()] = i
+            index.setdefault(s["name"].strip().lower(), i)
+        refuel_mask = np.array([bool(s.get("can_refuel")) for s in sites], dtype=bool)
+        if sites:
+            distances = np.load(path, mmap_mode="r")
+        else:
+            distances, path = np.zeros((0, 0), dtype=np.float32), None
+        return sites, index, refuel_mask, distances, path
+
+    # ---------------- lookups ---------------- #
+    def resolve(self, site: str) -> int:
+        """Site code or exact name -> matrix index"""
+        i = self.index.get(site.upper())
+        if i is None:
+            i = self.index.get(site.strip().lower())
+        if i is None:
+            raise KeyError(site)
+        return i
+
+    def distance_km(self, i: int, j: int) -> float:
+        return float(self.distances[i, j])
+
+    @staticmethod
+    def flight_minutes(distance_km: float, speed_kmh: float) -> float:
+        return distance_km / speed_kmh * 60.0
+
+    # ---------------- routing ---------------- #
+    def plan(self, src: int, dst: int, range_km: float, speed_kmh: float) -> dict:
+        """Fastest route src -> dst with refuelling stops; raises NoRouteError"""
+        if range_km <= 0 or speed_kmh <= 0:
+            raise NoRouteError("Aircraft range and speed must be positive")
+
+        D = self.distances
+        n = D.shape[0]
+        usable_km = range_km * (1 - RESERVE_FRACTION)
+        minutes_per_km = 60.0 / speed_kmh
+
+        h = np.asarray(D[dst], dtype=np.float64) * minutes_per_km
+        allowed = self.refuel_mask.copy()
+        allowed[dst] = True
+
+        g = np.full(n, np.inf)
+        f = np.full(n, np.inf)
+        prev = np.full(n, -1, dtype=np.int64)
+        closed = np.zeros(n, dtype=bool)
+        g[src] = 0.0
+        f[src] = h[src]
+
+        while True:
+            u = int(np.argmin(f))
+            if not np.isfinite(f[u]):
+                raise NoRouteError("No route within aircraft range")
+            if u == dst:
+                break
+            closed[u] = True
+            f[u] = np.inf
+
+            row = np.asarray(D[u], dtype=np.float64)
+            stop_cost = REFUEL_STOP_MINUTES if u != src else 0.0
+            cost = g[u] + stop_cost + row * minutes_per_km
+            better = allowed & ~closed & (row <= usable_km) & (cost < g)
+            better[u] = False
+            g[better] = cost[better]
+            f[better] = g[better] + h[better]
+            prev[better] = u
+
+        path = [dst]
+        while path[-1] != src:
+            path.append(int(prev[path[-1]]))
+        path.reverse()
+
+        legs = []
+        for a, b in zip(path, path[1:]):
+            km = self.distance_km(a, b)
+            legs.append({
+                "from": self.sites[a]["code"],
+                "to": self.sites[b]["code"],
+                "distance_km": round(km, 1),
+                "flight_minutes": round(self.flight_minutes(km, speed_kmh), 1),
+            })
+        return {
+            "from": self.sites[src]["code"],
+            "to": self.sites[dst]["code"],
+            "legs": legs,
+            "refuel_stops": [self.sites[i]["code"] for i in path[1:-1]],
+            "total_distance_km": round(sum(l["distance_km"] for l in legs), 1),
+            "total_minutes": round(float(g[dst]), 1),
+            "direct_distance_km": round(self.distance_km(src, dst), 1),
+        }
+
+
+route_planner = RoutePlanner()
@@ -0,0 +1,63 @@
+# routes/admin_routes.py
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import PlainTextResponse
+from profiling import sampling_profiler, slow_requests, loop_lag_monitor, SLOW_REQUEST_MS
+from utils import verify_token
+from datetime import datetime
+import os
+
+admin_router = APIRouter()
+
+
+def require_superadmin(token_data: dict = Depends(verify_token)):
+    if token_data["role"] != "superadmin":
+        raise HTTPException(status_code=403, detail="Only superadmin can use profiling")
+    return token_data
+
+
+# ---------------------------------------------------------
+# ON-DEMAND SAMPLING PROFILE (this worker only)
+#   curl -X POST -H "token: ..." ".../api/admin/profile?seconds=10" > out.folded
+#   flamegraph.pl out.folded > out.svg   (or load into speedscope)
+# ---------------------------------------------------------
+@admin_router.post("/profile")
+async def run_profile(
+    seconds: float = Query(10, gt=0, le=120),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    all_threads: bool = False,
+    token_data: dict = Depends(require_superadmin)
+):
+    try:
+        collapsed = await sampling_profiler.profile(seconds, interval_ms / 1000, all_threads)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    filename = f"profile_{os.getpid()}_{datetime.utcnow():%Y%m%dT%H%M%S}.folded"
+    return PlainTextResponse(collapsed, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Worker-Pid": str(os.getpid())
+    })
+
+
+# ---------------------------------------------------------
+# SLOW REQUESTS (ring buffer, this worker only)
+# ---------------------------------------------------------
+@admin_router.get("/slow-requests")
+async def list_slow_requests(limit: int = Query(50, ge=1, le=1000), token_data: dict = Depends(require_superadmin)):
+    recent = list(slow_requests)[-limit:]
+    recent.reverse()
+    return {"worker_pid": os.getpid(), "threshold_ms": SLOW_REQUEST_MS, "requests": recent}
+
+
+@admin_router.delete("/slow-requests")
+async def clear_slow_requests(token_data: dict = Depends(require_superadmin)):
+    slow_requests.clear()
+    return {"message": "Slow request buffer cleared"}
+
+
+# ---------------------------------------------------------
+# EVENT LOOP LAG / BLOCKING CALLS
+# ---------------------------------------------------------
+@admin_router.get("/loop-lag")
+async def loop_lag(token_data: dict = Depends(require_superadmin)):
+    return {"worker_pid": os.getpid(), **loop_lag_monitor.stats()}
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from bson import ObjectId
-from models.aircraft import Aircraft, MaintenanceRecord, UpdateMaintenanceStatus, AddMaintenance
-from database import db
-from utils import verify_token, serialize_doc
+from models.aircraft import Aircraft, AircraftOut, AircraftListAdapter, MaintenanceRecord, UpdateMaintenanceStatus, AddMaintenance
+from repository import tenant_repository, TENANT_FIELD
+from utils import verify_token, optional_token
+from http_cache import bump_version, conditional_json
+from audit_log import audit_log
+from maintenance_scheduler import maintenance_sweeper, upcoming_maintenance
+from datetime import datetime
+from typing import List
 
 aircraft_router = APIRouter()
 
@@ -15,10 +20,16 @@ async def create_aircraft(aircraft: Aircraft, token_data: dict = Depends(verify_
     if token_data["role"] != "superadmin":
         raise HTTPException(status_code=403, detail="Only superadmin can create aircraft")
 
-    aircraft_dict = aircraft.dict()
-    aircraft_dict.pop("id", None)  # Remove optional id field
+    repo = tenant_repository(token_data)
+    if repo.tenant is not None and aircraft.airline_operator != repo.tenant:
+        raise HTTPException(status_code=403, detail="airline_operator must be your own operator")
 
-    result = await db.aircrafts.insert_one(aircraft_dict)
+    aircraft_dict = aircraft.model_dump(by_alias=True, exclude={"id"})
+    aircraft_dict["tenant"] = aircraft.airline_operator  # the operator owns the aircraft
+
+    result = await repo.aircrafts.insert_one(aircraft_dict)
+    await bump_version("aircrafts", tenant=aircraft.airline_operator)
+    audit_log.record("aircraft", result.inserted_id, "created", token_data.get("email"), {"registration": aircraft.registration}, tenant=aircraft.airline_operator)
 
     return {"id": str(result.inserted_id), "message": "Aircraft added successfully"}
 
@@ -36,32 +47,40 @@ async def add_maintenance(
     if token_data["role"] != "superadmin":
         raise HTTPException(status_code=403, detail="Only superadmin can add maintenance")
 
-    maintenance_record = {
-        "_id": ObjectId(),
-        "maintenance_type": data.maintenance_type,
-        "description": data.description,
-        "last_maintenance_date": data.last_maintenance_date,
-        "next_due_date": data.next_due_date,
-        "status": data.status,
-        "technician": data.technician
-    }
+    maintenance_record = MaintenanceRecord(**data.model_dump()).model_dump(by_alias=True)  # new "_id"
 
-    update_result = await db.aircrafts.update_one(
+    # Work without a due date (or already due) takes the aircraft out of service now;
+    # future work is held by the sweeper when it falls due.
+    hold_now = data.next_due_date is None or data.next_due_date <= datetime.utcnow()
+    fields = {"last_maintenance_date": data.last_maintenance_date}
+    if hold_now:
+        fields.update(available=False, maintenance_hold=True)   # released by the sweeper once records are completed
+
+    repo = tenant_repository(token_data)
+    # projection: only the tenant comes back, to tag the version bump and audit event
+    aircraft = await repo.aircrafts.find_one_and_update(
         {"_id": ObjectId(aircraft_id)},
         {
             "$push": {"maintenance_records": maintenance_record},
-            "$set": {
-                "last_maintenance_date": data.last_maintenance_date,
-                "available": False
-            }
-        }
+            "$set": fields
+        },
+        projection={TENANT_FIELD: 1}
     )
 
-    if update_result.matched_count == 0:
+    if not aircraft:
         raise HTTPException(status_code=404, detail="Aircraft not found")
+    await bump_version("aircrafts", tenant=aircraft.get(TENANT_FIELD))
+    audit_log.record("aircraft", aircraft_id, "maintenance_added", token_data.get("email"), {
+        "record_id": str(maintenance_record["_id"]),
+        "maintenance_type": data.maintenance_type,
+        "next_due_date": data.next_due_date,
+        "status": data.status
+    }, tenant=aircraft.get(TENANT_FIELD))
+    if data.next_due_date:
+        maintenance_sweeper.notify(data.next_due_date)
 
     return {
-        "message": "Maintenance added & aircraft marked unavailable",
+        "message": "Maintenance added & aircraft marked unavailable" if hold_now else "Maintenance scheduled; aircraft will be held when it falls due",
         "record_id": str(maintenance_record["_id"])
     }
 
@@ -74,10 +93,11 @@ async def update_maintenance_status(
     data: UpdateMaintenanceStatus,
     token_data: dict = Depends(verify_token)
 ):
-    if token_data["role"] != ["superadmin", "technician"]:
+    if token_data["role"] not in ["superadmin", "technician"]:
         raise HTTPException(status_code=403, detail="Only superadmin can update maintenance status")
 
-    update_result = await db.aircrafts.update_one(
+    repo = tenant_repository(token_data)
+    aircraft = await repo.aircrafts.find_one_and_update(
         {
             "_id": ObjectId(aircraft_id),
             "maintenance_records._id": ObjectId(record_id)
@@ -86,11 +106,15 @@ async def update_maintenance_status(
             "$set": {
                 "maintenance_records.$.status": data.status
             }
-        }
+        },
+        projection={TENANT_FIELD: 1}
     )
 
-    if update_result.matched_count == 0:
+    if not aircraft:
         raise HTTPException(status_code=404, detail="Aircraft or maintenance record not found")
+    await bump_version("aircrafts", tenant=aircraft.get(TENANT_FIELD))
+    audit_log.record("aircraft", aircraft_id, "maintenance_status", token_data.get("email"), {"record_id": record_id, "status": data.status}, tenant=aircraft.get(TENANT_FIELD))
+    maintenance_sweeper.notify()  # a completed record may release the aircraft
 
     return {"message": f"Maintenance record status updated to {data.status}"}
 
@@ -104,32 +128,71 @@ async def mark_aircraft_available(aircraft_id: str, token_data: dict = Depends(v
     if token_data["role"] not in ["superadmin", "dispatcher"]:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    result = await db.aircrafts.update_one(
+    repo = tenant_repository(token_data)
+    aircraft = await repo.aircrafts.find_one_and_update(
         {"_id": ObjectId(aircraft_id)},
-        {"$set": {"available": True}}
+        {"$set": {"available": True, "maintenance_hold": False}},
+        projection={TENANT_FIELD: 1}
     )
 
-    if result.matched_count == 0:
+    if not aircraft:
         raise HTTPException(status_code=404, detail="Aircraft not found")
+    await bump_version("aircrafts", tenant=aircraft.get(TENANT_FIELD))
+    audit_log.record("aircraft", aircraft_id, "marked_available", token_data.get("email"), tenant=aircraft.get(TENANT_FIELD))
 
     return {"message": "Aircraft is now available"}
 # ---------------------------------------------------------
 
 
 
-@aircraft_router.get("/available-aircrafts")
-async def list_available_aircrafts():
-    aircrafts = []
-    async for ac in db.aircrafts.find({"available": True}):
-        aircrafts.append(serialize_doc(ac))
-    return aircrafts
+# ---------------------------------------------------------
+# UPCOMING MAINTENANCE (next N days, overdue included)
+# ---------------------------------------------------------
+@aircraft_router.get("/upcoming-maintenance")
+async def list_upcoming_maintenance(
+    days: int = Query(7, ge=0, le=365),
+    token_data: dict = Depends(verify_token)
+):
+    if token_data["role"] not in ["superadmin", "dispatcher", "technician"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    now = datetime.utcnow()
+    records = await upcoming_maintenance(days, now, tenant=tenant_repository(token_data).tenant)
+    return {
+        "days": days,
+        "generated_at": now,
+        "overdue": sum(1 for r in records if r["overdue"]),
+        "records": records
+    }
+
+# ---------------------------------------------------------
+# RUN MAINTENANCE SWEEP NOW (SuperAdmin Only)
+# ---------------------------------------------------------
+@aircraft_router.post("/maintenance-sweep")
+async def run_maintenance_sweep(token_data: dict = Depends(verify_token)):
+    if token_data["role"] != "superadmin":
+        raise HTTPException(status_code=403, detail="Only superadmin can run the maintenance sweep")
+
+    maintenance_sweeper.notify()
+    return {"message": "Maintenance sweep triggered", "last_result": maintenance_sweeper.last_result}
+# ---------------------------------------------------------
+
+
+@aircraft_router.get("/available-aircrafts", response_model=List[AircraftOut])
+async def list_available_aircrafts(request: Request, token_data: dict = Depends(optional_token)):
+    repo = tenant_repository(token_data)
+
+    async def load():
+        return [ac async for ac in repo.aircrafts.find({"available": True})]
+    return await conditional_json(request, ["aircrafts"], load, tenant=repo.tenant, adapter=AircraftListAdapter)
+
+@aircraft_router.get("/list-aircrafts", response_model=List[AircraftOut])
+async def list_all_aircrafts(request: Request, token_data: dict = Depends(optional_token)):
+    repo = tenant_repository(token_data)
 
-@aircraft_router.get("/list-aircrafts")
-async def list_all_aircrafts():
-    aircrafts = []
-    async for ac in db.aircrafts.find():
-        aircrafts.append(serialize_doc(ac))
-    return aircrafts
+    async def load():
+        return [ac async for ac in repo.aircrafts.find()]
+    return await conditional_json(request, ["aircrafts"], load, tenant=repo.tenant, adapter=AircraftListAdapter)
 # ---------------------------------------------------------
 
 @aircraft_router.delete("/delete/{aircraft_id}")
@@ -144,10 +207,13 @@ async def delete_aircraft(aircraft_id: str, token_data: dict = Depends(verify_to
         raise HTTPException(status_code=400, detail="Invalid aircraft ID format")
 
     # Delete aircraft
-    result = await db.aircrafts.delete_one({"_id": ObjectId(aircraft_id)})
+    repo = tenant_repository(token_data)
+    aircraft = await repo.aircrafts.find_one_and_delete({"_id": ObjectId(aircraft_id)}, projection={TENANT_FIELD: 1})
 
-    if result.deleted_count == 0:
+    if not aircraft:
         raise HTTPException(status_code=404, detail="Aircraft not found")
+    await bump_version("aircrafts", tenant=aircraft.get(TENANT_FIELD))
+    audit_log.record("aircraft", aircraft_id, "deleted", token_data.get("email"), tenant=aircraft.get(TENANT_FIELD))
 
     return {"message": "Aircraft deleted successfully"}
 
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Header, Depends
-from database import db
-from models.ambulance import Ambulance, MaintenanceRecord
-from utils import decode_token
+from fastapi import APIRouter, HTTPException, Header, Depends, Request
+from repository import tenant_repository, TENANT_FIELD
+from models.ambulance import Ambulance, AmbulanceOut, AmbulanceListAdapter, MaintenanceRecord
+from utils import decode_token, optional_token
+from http_cache import bump_version, conditional_json
+from audit_log import audit_log
 from bson import ObjectId
 from datetime import datetime
+from typing import List
 
 ambulance_router = APIRouter()
 
@@ -17,31 +20,37 @@ def get_current_user(token: str = Header(...)):
 async def create_ambulance(ambulance: Ambulance, current_user: dict = Depends(get_current_user)):
     if current_user["role"] != "superadmin":
         raise HTTPException(status_code=403, detail="Not authorized")
-    result = await db.ambulances.insert_one(ambulance.dict())
+    repo = tenant_repository(current_user)
+    result = await repo.ambulances.insert_one(ambulance.model_dump(exclude={"id"}))
+    await bump_version("ambulances", tenant=repo.tenant)
+    audit_log.record("ambulance", result.inserted_id, "created", current_user.get("email"), {"name": ambulance.name}, tenant=repo.tenant)
     return {"id": str(result.inserted_id), "message": "Ambulance added"}
 
 @ambulance_router.put("/add-maintenance/{ambulance_id}")
 async def add_maintenance(ambulance_id: str, record: MaintenanceRecord, current_user: dict = Depends(get_current_user)):
-    ambulance = await db.ambulances.find_one({"_id": ObjectId(ambulance_id)})
+    repo = tenant_repository(current_user)
+    ambulance = await repo.ambulances.find_one({"_id": ObjectId(ambulance_id)})
     if not ambulance:
         raise HTTPException(status_code=404, detail="Ambulance not found")
     
-    record_dict = record.dict()
-    record_dict["date"] = datetime.utcnow().isoformat()
-    await db.ambulances.update_one(
+    record_dict = record.model_copy(update={"date": datetime.utcnow().isoformat()}).model_dump()
+    await repo.ambulances.update_one(
         {"_id": ObjectId(ambulance_id)},
         {
             "$push": {"maintenance_records": record_dict},
             "$set": {"last_maintenance_date": record_dict["date"], "available": True}
         }
     )
+    # a shared-pool ambulance (no tenant) shows up in every operator's list
+    tenant = ambulance.get(TENANT_FIELD)
+    await bump_version("ambulances", tenant=tenant)
+    audit_log.record("ambulance", ambulance_id, "maintenance_added", current_user.get("email"), {"details": record_dict["details"]}, tenant=tenant)
     return {"message": "Maintenance record added"}
 
-@ambulance_router.get("/available-ambulances")
-async def available_ambulances():
-    ambulances = []
-    async for amb in db.ambulances.find({"available": True}):
-        amb["id"] = str(amb["_id"])
-        del amb["_id"]
-        ambulances.append(amb)
-    return ambulances
+@ambulance_router.get("/available-ambulances", response_model=List[AmbulanceOut])
+async def available_ambulances(request: Request, current_user: dict = Depends(optional_token)):
+    repo = tenant_repository(current_user)
+
+    async def load():
+        return [amb async for amb in repo.ambulances.find({"available": True})]
+    return await conditional_json(request, ["ambulances"], load, tenant=repo.tenant, adapter=AmbulanceListAdapter)
@@ -0,0 +1,94 @@
+# routes/audit_routes.py
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from database import db
+from audit_log import audit_log, EVENTS_COLLECTION
+from utils import verify_token, serialize_doc
+from repository import tenant_of
+from datetime import datetime
+from typing import Optional
+import json
+
+audit_router = APIRouter()
+
+AUDIT_ROLES = ["superadmin", "dispatcher"]
+EXPORT_BATCH_SIZE = 1000
+
+
+def require_audit_role(token_data: dict):
+    if token_data["role"] not in AUDIT_ROLES:
+        raise HTTPException(status_code=403, detail="Not authorized to read the audit log")
+
+
+def event_out(event: dict) -> dict:
+    event = serialize_doc(event)
+    event.pop("_id", None)
+    meta = event.pop("meta", {}) or {}
+    event["entity"] = meta.get("entity")
+    event["entity_id"] = meta.get("entity_id")
+    event["tenant"] = meta.get("tenant")
+    return jsonable_encoder(event)
+
+
+# Timeline of one entity (newest first)
+@audit_router.get("/timeline/{entity}/{entity_id}")
+async def entity_timeline(
+    entity: str,
+    entity_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    before: Optional[datetime] = None,
+    token_data: dict = Depends(verify_token)
+):
+    require_audit_role(token_data)
+
+    query = {"meta.entity": entity, "meta.entity_id": entity_id}
+    tenant = tenant_of(token_data)
+    if tenant is not None:
+        query = {"meta.tenant": tenant, **query}
+    if before:
+        query["ts"] = {"$lt": before}
+
+    events = []
+    async for ev in db[EVENTS_COLLECTION].find(query).sort("ts", -1).limit(limit):
+        events.append(event_out(ev))
+    return {"entity": entity, "entity_id": entity_id, "events": events}
+
+
+# Streamed export of a time range as NDJSON (oldest first)
+@audit_router.get("/export")
+async def export_events(
+    start: datetime,
+    end: datetime,
+    entity: Optional[str] = None,
+    token_data: dict = Depends(verify_token)
+):
+    require_audit_role(token_data)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    query = {"ts": {"$gte": start, "$lt": end}}
+    tenant = tenant_of(token_data)
+    if tenant is not None:
+        query["meta.tenant"] = tenant
+    if entity:
+        query["meta.entity"] = entity
+
+    async def stream():
+        cursor = db[EVENTS_COLLECTION].find(query).sort("ts", 1).batch_size(EXPORT_BATCH_SIZE)
+        async for ev in cursor:
+            yield json.dumps(event_out(ev), separators=(",", ":")) + "\n"
+
+    filename = f"events_{start:%Y%m%dT%H%M%S}_{end:%Y%m%dT%H%M%S}.ndjson"
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# Writer health for this worker
+@audit_router.get("/stats")
+async def audit_stats(token_data: dict = Depends(verify_token)):
+    require_audit_role(token_data)
+    return audit_log.stats()
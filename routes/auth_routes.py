@@ -1,21 +1,30 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header
 from models.user import UserRegister, UserLogin
 from database import db
-from utils import hash_password, verify_password, create_access_token
+from utils import hash_password, verify_password, create_access_token, decode_token
+from typing import Optional
+from audit_log import audit_log
 
 
 auth_router = APIRouter()
 
 # Registration (role required)
 @auth_router.post("/register")
-async def register(user: UserRegister):
+async def register(user: UserRegister, token: Optional[str] = Header(None)):
+    # The operator becomes the user's tenant scope, so only a superadmin may assign one.
+    if user.operator:
+        caller = decode_token(token) if token else None
+        if not caller or caller.get("role") != "superadmin":
+            raise HTTPException(status_code=403, detail="Only superadmin can assign an operator")
+
     existing_user = await db.users.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
     
-    user_dict = user.dict()
+    user_dict = user.model_dump()
     user_dict["password"] = hash_password(user.password)
-    await db.users.insert_one(user_dict)
+    result = await db.users.insert_one(user_dict)
+    audit_log.record("user", result.inserted_id, "registered", user.email, {"role": user.role}, tenant=user.operator)
     return {"message": "User registered successfully"}
 
 # Login (role NOT required)
@@ -25,5 +34,8 @@ async def login(user: UserLogin):
     if not db_user or not verify_password(user.password, db_user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    token = create_access_token({"email": db_user["email"], "role": db_user["role"]})
+    claims = {"email": db_user["email"], "role": db_user["role"]}
+    if db_user.get("operator"):
+        claims["operator"] = db_user["operator"]  # tenant scope, see repository.py
+    token = create_access_token(claims)
     return {"access_token": token}
@@ -0,0 +1,71 @@
+# routes/bulk_routes.py
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+from database import db
+from repository import tenant_repository
+from bulk_io import ENTITIES, FORMATS, export_stream, parse_csv, parse_ndjson, import_rows
+from http_cache import bump_version
+from audit_log import audit_log
+from utils import verify_token
+from datetime import datetime
+
+bulk_router = APIRouter()
+
+EXPORT_CURSOR_BATCH = 2000
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def get_entity_or_404(entity: str):
+    if entity not in ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown entity '{entity}'. Use one of: {', '.join(ENTITIES)}")
+    return ENTITIES[entity]
+
+
+def check_format(fmt: str):
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+
+
+# ---------------------------------------------------------
+# EXPORT (streamed straight from the cursor)
+# ---------------------------------------------------------
+@bulk_router.get("/export/{entity}")
+async def export_entity(entity: str, format: str = Query("ndjson"), token_data: dict = Depends(verify_token)):
+    if token_data["role"] not in ["superadmin", "dispatcher"]:
+        raise HTTPException(status_code=403, detail="Not authorized to export")
+    spec = get_entity_or_404(entity)
+    check_format(format)
+
+    cursor = tenant_repository(token_data)[spec.collection].find().batch_size(EXPORT_CURSOR_BATCH)
+    filename = f"{entity}_{datetime.utcnow():%Y%m%dT%H%M%S}.{format}"
+    return StreamingResponse(
+        export_stream(spec, cursor, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# ---------------------------------------------------------
+# IMPORT (request body streamed, validated + written in chunks)
+#   curl -X POST --data-binary @fleet.csv -H "token: ..." \
+#        ".../api/bulk/import/aircraft?format=csv"
+# ---------------------------------------------------------
+@bulk_router.post("/import/{entity}")
+async def import_entity(entity: str, request: Request, format: str = Query("ndjson"), token_data: dict = Depends(verify_token)):
+    if token_data["role"] != "superadmin":
+        raise HTTPException(status_code=403, detail="Only superadmin can import")
+    spec = get_entity_or_404(entity)
+    check_format(format)
+
+    tenant = tenant_repository(token_data).tenant
+    parser = parse_csv if format == "csv" else parse_ndjson
+    result = await import_rows(spec, db[spec.collection], parser(request.stream()), tenant)
+
+    if result["inserted"] or result["upserted"] or result["updated"]:
+        await bump_version(spec.collection, tenant=tenant)
+        if spec.cache is not None:
+            await spec.cache.invalidate_all()
+    audit_log.record("bulk_import", entity, "imported", token_data.get("email"), {
+        k: v for k, v in result.items() if k != "errors"
+    }, tenant=tenant)
+    return result
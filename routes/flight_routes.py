@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, Header, Depends
-from database import db
-from models.flight_request import FlightRequest
-from utils import decode_token
+from fastapi import APIRouter, HTTPException, Header, Depends, Request
+from repository import TENANT_FIELD, tenant_repository
+from models.flight_request import FlightRequest, FlightRequestOut, FlightRequestListAdapter
+from utils import decode_token, optional_token
+from http_cache import bump_version, conditional_json
+from audit_log import audit_log
+from query_cache import flight_request_cache
+from pymongo import ReturnDocument
 from bson import ObjectId
 from datetime import datetime
+from typing import List
 
 flight_router = APIRouter()
 
@@ -27,16 +32,19 @@ async def create_flight_request(request: FlightRequest, current_user: dict = Dep
     # Combine date + time into MongoDB safe datetime
     combined_dt = datetime.combine(request.flight_date, request.flight_time)
 
-    request_dict = request.dict()
+    # date/time are replaced by the combined field (BSON has no date-only/time-only type)
+    request_dict = request.model_dump(exclude={"flight_date", "flight_time"})
     request_dict["status"] = "Pending"
     request_dict["flight_datetime"] = combined_dt  # <-- MongoDB-safe field
 
-    # Remove original fields (optional, but recommended)
-    del request_dict["flight_date"]
-    del request_dict["flight_time"]
-
     # Insert into DB
-    result = await db.flight_requests.insert_one(request_dict)
+    repo = tenant_repository(current_user)
+    result = await repo.flight_requests.insert_one(request_dict)
+    await bump_version("flight_requests", tenant=repo.tenant)
+    audit_log.record("flight_request", result.inserted_id, "created", current_user.get("email"), {
+        "from_hospital": request.from_hospital,
+        "to_hospital": request.to_hospital
+    }, tenant=repo.tenant)
 
     return {
         "id": str(result.inserted_id),
@@ -60,7 +68,9 @@ async def approve_flight_request(request_id: str, current_user: dict = Depends(g
         raise HTTPException(status_code=400, detail="Invalid request ID")
 
     # Check if request exists
-    flight_request = await db.flight_requests.find_one({"_id": ObjectId(request_id)})
+    oid = ObjectId(request_id)
+    repo = tenant_repository(current_user)
+    flight_request = await flight_request_cache.get(str(oid), lambda: repo.flight_requests.find_one({"_id": oid}), repo.tenant)
     if not flight_request:
         raise HTTPException(status_code=404, detail="Flight request not found")
 
@@ -68,15 +78,26 @@ async def approve_flight_request(request_id: str, current_user: dict = Depends(g
     if flight_request.get("status") != "Pending":
         raise HTTPException(status_code=400, detail="Request already processed")
 
-    # Update status to APPROVED
-    await db.flight_requests.update_one(
-        {"_id": ObjectId(request_id)},
-        {"$set": {
+    # Update status to APPROVED (only if still pending - guards double approval).
+    # An operator approving an unclaimed request claims it (see repository.py).
+    before = await flight_request_cache.version(str(oid))
+    updated = await repo.flight_requests.find_one_and_update(
+        {"_id": oid, "status": "Pending"},
+        {"$set": repo.flight_requests.stamp({
             "status": "Approved",
             "approved_by": current_user["email"],
             "approved_at": datetime.utcnow()
-        }}
+        })},
+        return_document=ReturnDocument.AFTER
     )
+    if not updated:
+        await flight_request_cache.invalidate(str(oid), repo.tenant)
+        raise HTTPException(status_code=400, detail="Request already processed")
+    await flight_request_cache.put(str(oid), updated, before, repo.tenant)
+    tenant = updated.get(TENANT_FIELD)
+    # a claim removes the request from every other operator's list
+    await bump_version("flight_requests", tenant=tenant if flight_request.get(TENANT_FIELD) is not None else None)
+    audit_log.record("flight_request", request_id, "approved", current_user["email"], {"status": "Approved"}, tenant=tenant)
 
     return {"message": "Flight request approved successfully"}
 
@@ -84,11 +105,10 @@ async def approve_flight_request(request_id: str, current_user: dict = Depends(g
 # ============================
 # LIST FLIGHT REQUESTS
 # ============================
-@flight_router.get("/list-flight-requests")
-async def list_flight_requests():
-    requests = []
-    async for fr in db.flight_requests.find():
-        fr["id"] = str(fr["_id"])
-        del fr["_id"]
-        requests.append(fr)
-    return requests
+@flight_router.get("/list-flight-requests", response_model=List[FlightRequestOut])
+async def list_flight_requests(request: Request, current_user: dict = Depends(optional_token)):
+    repo = tenant_repository(current_user)
+
+    async def load():
+        return [fr async for fr in repo.flight_requests.find()]
+    return await conditional_json(request, ["flight_requests"], load, tenant=repo.tenant, adapter=FlightRequestListAdapter)
@@ -0,0 +1,111 @@
+# routes/routing_routes.py
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from database import db
+from repository import tenant_repository
+from models.site import Site, SiteListAdapter
+from route_planner import route_planner, NoRouteError
+from http_cache import bump_version, conditional_json
+from audit_log import audit_log
+from utils import verify_token
+from bson import ObjectId
+from typing import List, Optional
+
+routing_router = APIRouter()
+
+
+async def ensure_site_indexes():
+    await db.sites.create_index("code", unique=True)
+
+
+def resolve_or_404(site: str) -> int:
+    try:
+        return route_planner.resolve(site)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Site not registered: {site}")
+
+
+# ---------------------------------------------------------
+# REGISTER / UPDATE SITE (SuperAdmin Only)
+# ---------------------------------------------------------
+@routing_router.put("/sites")
+async def upsert_site(site: Site, token_data: dict = Depends(verify_token)):
+    if token_data["role"] != "superadmin":
+        raise HTTPException(status_code=403, detail="Only superadmin can register sites")
+
+    site_dict = site.model_dump()
+    site_dict["code"] = site_dict["code"].strip().upper()
+    await ensure_site_indexes()
+    await db.sites.update_one({"code": site_dict["code"]}, {"$set": site_dict}, upsert=True)
+    await bump_version("sites")  # every worker's route_planner reloads on its next query
+    audit_log.record("site", site_dict["code"], "upserted", token_data.get("email"), site_dict)
+    return {"message": "Site saved", "code": site_dict["code"]}
+
+
+@routing_router.delete("/sites/{code}")
+async def delete_site(code: str, token_data: dict = Depends(verify_token)):
+    if token_data["role"] != "superadmin":
+        raise HTTPException(status_code=403, detail="Only superadmin can delete sites")
+
+    result = await db.sites.delete_one({"code": code.strip().upper()})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Site not found")
+    await bump_version("sites")
+    audit_log.record("site", code.strip().upper(), "deleted", token_data.get("email"))
+    return {"message": "Site deleted"}
+
+
+@routing_router.get("/sites", response_model=List[Site])
+async def list_sites(request: Request):
+    async def load():
+        return [s async for s in db.sites.find({}, {"_id": 0}).sort("code", 1)]
+    return await conditional_json(request, ["sites"], load, adapter=SiteListAdapter)
+
+
+# ---------------------------------------------------------
+# DISTANCE LOOKUP (O(1) from the matrix)
+# ---------------------------------------------------------
+@routing_router.get("/distance")
+async def site_distance(from_site: str, to_site: str, speed_kmh: Optional[float] = Query(None, gt=0)):
+    await route_planner.ensure_current()
+    i, j = resolve_or_404(from_site), resolve_or_404(to_site)
+    km = route_planner.distance_km(i, j)
+    out = {"from": route_planner.sites[i]["code"], "to": route_planner.sites[j]["code"], "distance_km": round(km, 1)}
+    if speed_kmh:
+        out["flight_minutes"] = round(route_planner.flight_minutes(km, speed_kmh), 1)
+    return out
+
+
+# ---------------------------------------------------------
+# BEST ROUTE (with refuelling stops)
+# ---------------------------------------------------------
+@routing_router.get("/route")
+async def plan_route(
+    from_site: str,
+    to_site: str,
+    aircraft_id: Optional[str] = None,
+    range_km: Optional[float] = Query(None, gt=0),
+    speed_kmh: Optional[float] = Query(None, gt=0),
+    token_data: dict = Depends(verify_token)
+):
+    if aircraft_id:
+        if not ObjectId.is_valid(aircraft_id):
+            raise HTTPException(status_code=400, detail="Invalid aircraft ID format")
+        aircraft = await tenant_repository(token_data).aircrafts.find_one(
+            {"_id": ObjectId(aircraft_id)}, {"range_km": 1, "speed_kmh": 1, "registration": 1}
+        )
+        if not aircraft:
+            raise HTTPException(status_code=404, detail="Aircraft not found")
+        range_km = range_km or aircraft["range_km"]
+        speed_kmh = speed_kmh or aircraft["speed_kmh"]
+    if not range_km or not speed_kmh:
+        raise HTTPException(status_code=400, detail="Provide aircraft_id or both range_km and speed_kmh")
+
+    await route_planner.ensure_current()
+    src, dst = resolve_or_404(from_site), resolve_or_404(to_site)
+    try:
+        route = route_planner.plan(src, dst, range_km, speed_kmh)
+    except NoRouteError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    route.update({"aircraft_id": aircraft_id, "range_km": range_km, "speed_kmh": speed_kmh})
+    return route
@@ -1,39 +1,36 @@
 # routes/schedule_routes.py
-from fastapi import APIRouter, HTTPException, Depends, Header
-from database import db, scheduling_collection
-from models.schedule import ScheduleCreate, ScheduleOut, UpdateETA, UpdateStatus, AssignCrew
-from utils import verify_token, decode_token
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
+from repository import TENANT_FIELD, TenantRepository, tenant_repository
+from models.schedule import ScheduleCreate, ScheduleOut, ScheduleListAdapter, UpdateETA, UpdateStatus, AssignCrew, VALID_TRANSITIONS
+from utils import verify_token, decode_token, optional_token
+from http_cache import bump_version, conditional_json
+from audit_log import audit_log
+from query_cache import schedule_cache, flight_request_cache
+from pymongo import ReturnDocument
 from bson import ObjectId
 from datetime import datetime, timedelta
 from typing import List
 
 schedule_router = APIRouter()
 
-# Allowed status transitions (small state-machine)
-VALID_TRANSITIONS = {
-    "Scheduled": ["Dispatched", "Cancelled"],
-    "Dispatched": ["In-Transit", "Cancelled"],
-    "In-Transit": ["Completed"],
-    "Completed": [],
-    "Cancelled": []
-}
-
 def objid(val: str):
     try:
         return ObjectId(val)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
-# Helper to fetch flight request
-async def get_flight_request_or_404(fr_id: str):
-    fr = await db.flight_requests.find_one({"_id": objid(fr_id)})
+# Helper to fetch flight request (within the caller's tenant)
+async def get_flight_request_or_404(fr_id: str, repo: TenantRepository):
+    oid = objid(fr_id)
+    fr = await flight_request_cache.get(str(oid), lambda: repo.flight_requests.find_one({"_id": oid}), repo.tenant)
     if not fr:
         raise HTTPException(status_code=404, detail="Flight request not found")
     return fr
 
-# Helper to fetch schedule
-async def get_schedule_or_404(sched_id: str):
-    sched = await db.schedules.find_one({"_id": objid(sched_id)})
+# Helper to fetch schedule (within the caller's tenant)
+async def get_schedule_or_404(sched_id: str, repo: TenantRepository):
+    oid = objid(sched_id)
+    sched = await schedule_cache.get(str(oid), lambda: repo.schedules.find_one({"_id": oid}), repo.tenant)
     if not sched:
         raise HTTPException(status_code=404, detail="Schedule not found")
     return sched
@@ -51,11 +48,12 @@ async def create_schedule(schedule: ScheduleCreate, token_data: dict = Depends(v
         raise HTTPException(status_code=403, detail="Not authorized to create schedule")
 
     # ensure flight request exists
-    fr = await get_flight_request_or_404(schedule.flight_request_id)
+    repo = tenant_repository(payload)
+    fr = await get_flight_request_or_404(schedule.flight_request_id, repo)
 
     # build schedule document
     now = datetime.utcnow()
-    sched_doc = schedule.dict()
+    sched_doc = schedule.model_dump()
     sched_doc.update({
         "status": "Scheduled",
         "created_at": now,
@@ -74,16 +72,42 @@ async def create_schedule(schedule: ScheduleCreate, token_data: dict = Depends(v
             "last_updated": now
         }
 
-    result = await db.schedules.insert_one(sched_doc)
+    # Update flight_request status to "Scheduled"; an operator scheduling an
+    # unclaimed request claims it (the filter fails if another operator did first)
+    was_claimed = fr.get(TENANT_FIELD) is not None
+    before = await flight_request_cache.version(str(fr["_id"]))
+    fr = await repo.flight_requests.find_one_and_update(
+        {"_id": fr["_id"]},
+        {"$set": repo.flight_requests.stamp({"status": "Scheduled"})},
+        return_document=ReturnDocument.AFTER
+    )
+    if not fr:
+        raise HTTPException(status_code=409, detail="Flight request was claimed by another operator")
+    await flight_request_cache.put(str(fr["_id"]), fr, before, repo.tenant)
 
-    # Update flight_request status to "Scheduled"
-    await db.flight_requests.update_one({"_id": objid(schedule.flight_request_id)}, {"$set": {"status": "Scheduled"}})
+    # the schedule belongs to whoever owns the flight request (also for unscoped callers)
+    tenant = fr.get(TENANT_FIELD)
+    if tenant is not None:
+        sched_doc[TENANT_FIELD] = tenant
+    result = await repo.schedules.insert_one(sched_doc)
+
+    await bump_version("schedules", tenant=tenant)
+    # a claim removes the request from every other operator's list
+    await bump_version("flight_requests", tenant=tenant if was_claimed else None)
+    audit_log.record("schedule", result.inserted_id, "created", payload.get("email"), {"flight_request_id": schedule.flight_request_id}, tenant=tenant)
+    audit_log.record("flight_request", schedule.flight_request_id, "status", payload.get("email"), {"status": "Scheduled"}, tenant=tenant)
 
     return {"id": str(result.inserted_id), "message": "Schedule created"}
 
 # List schedules (optionally filter by flight_request_id or status)
-@schedule_router.get("/list-schedules")
-async def list_schedules(flight_request_id: str = None, status: str = None) -> List[dict]:
+@schedule_router.get("/list-schedules", response_model=List[ScheduleOut])
+async def list_schedules(
+    request: Request,
+    flight_request_id: str = None,
+    status: str = None,
+    token_data: dict = Depends(optional_token)
+):
+    repo = tenant_repository(token_data)
     query = {}
     if flight_request_id:
         # allow plain id string
@@ -91,20 +115,24 @@ async def list_schedules(flight_request_id: str = None, status: str = None) -> L
     if status:
         query["status"] = status
 
-    schedules = []
-    async for s in db.schedules.find(query):
-        s["id"] = str(s["_id"])
-        del s["_id"]
-        schedules.append(s)
-    return schedules
+    async def load() -> List[dict]:
+        return [s async for s in repo.schedules.find(query)]
+    return await conditional_json(request, ["schedules"], load, tenant=repo.tenant, adapter=ScheduleListAdapter)
+
+# Cache statistics for this worker (superadmin)
+@schedule_router.get("/cache-stats")
+async def cache_stats(token_data: dict = Depends(verify_token)):
+    if token_data["role"] != "superadmin":
+        raise HTTPException(status_code=403, detail="Only superadmin can view cache stats")
+    return {
+        "schedules": schedule_cache.stats(),
+        "flight_requests": flight_request_cache.stats()
+    }
 
 # Get schedule by id
-@schedule_router.get("/{schedule_id}")
-async def get_schedule(schedule_id: str):
-    s = await get_schedule_or_404(schedule_id)
-    s["id"] = str(s["_id"])
-    del s["_id"]
-    return s
+@schedule_router.get("/{schedule_id}", response_model=ScheduleOut)
+async def get_schedule(schedule_id: str, token_data: dict = Depends(optional_token)):
+    return await get_schedule_or_404(schedule_id, tenant_repository(token_data))
 
 # Update ETA (dispatcher/superadmin)
 @schedule_router.put("/update-eta/{schedule_id}")
@@ -113,7 +141,8 @@ async def update_eta(schedule_id: str, payload: UpdateETA, token_data: dict = De
     if user["role"] not in ["superadmin", "dispatcher"]:
         raise HTTPException(status_code=403, detail="Not authorized to update ETA")
 
-    sched = await get_schedule_or_404(schedule_id)
+    repo = tenant_repository(user)
+    sched = await get_schedule_or_404(schedule_id, repo)
 
     now = datetime.utcnow()
     eta_doc = {
@@ -122,7 +151,18 @@ async def update_eta(schedule_id: str, payload: UpdateETA, token_data: dict = De
         "last_updated": now
     }
 
-    await db.schedules.update_one({"_id": objid(schedule_id)}, {"$set": {"eta": eta_doc, "updated_at": now}})
+    before = await schedule_cache.version(str(sched["_id"]))
+    sched = await repo.schedules.find_one_and_update(
+        {"_id": sched["_id"]},
+        {"$set": {"eta": eta_doc, "updated_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+    await schedule_cache.put(str(objid(schedule_id)), sched, before, repo.tenant)
+    if not sched:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    # tag with the schedule's tenant: a superadmin's repo is unscoped
+    await bump_version("schedules", tenant=sched.get(TENANT_FIELD))
+    audit_log.record("schedule", schedule_id, "eta_updated", user.get("email"), {"eta": eta_doc}, tenant=sched.get(TENANT_FIELD))
 
     return {"message": "ETA updated", "eta": eta_doc}
 
@@ -133,11 +173,8 @@ async def update_schedule_status(schedule_id: str, body: dict, auth=Depends(veri
 
     new_status = body["status"]
 
-    # FIX: MUST AWAIT
-    schedule = await scheduling_collection.find_one({"_id": ObjectId(schedule_id)})
-
-    if not schedule:
-        raise HTTPException(status_code=404, detail="Schedule not found")
+    repo = tenant_repository(auth)
+    schedule = await get_schedule_or_404(schedule_id, repo)
 
     current_status = schedule["status"]
 
@@ -149,14 +186,20 @@ async def update_schedule_status(schedule_id: str, body: dict, auth=Depends(veri
 
     now = datetime.utcnow()
 
-    # FIX: MUST AWAIT
-    await scheduling_collection.update_one(
-        {"_id": ObjectId(schedule_id)},
-        {
-            "$set": {"status": new_status, "updated_at": now},
-            "$push": {"status_flow": {"status": new_status, "time": now}}
-        }
+    # Guard on the status we validated against, so two racing transitions can't both apply.
+    # History goes to the audit log (see /api/audit/timeline) instead of growing this document.
+    before = await schedule_cache.version(str(schedule["_id"]))
+    updated = await repo.schedules.find_one_and_update(
+        {"_id": schedule["_id"], "status": current_status},
+        {"$set": {"status": new_status, "updated_at": now}},
+        return_document=ReturnDocument.AFTER
     )
+    if not updated:
+        await schedule_cache.invalidate(str(schedule["_id"]), repo.tenant)
+        raise HTTPException(status_code=409, detail="Schedule status changed concurrently, please retry")
+    await schedule_cache.put(str(schedule["_id"]), updated, before, repo.tenant)
+    await bump_version("schedules", tenant=updated.get(TENANT_FIELD))
+    audit_log.record("schedule", schedule_id, "status", auth.get("email"), {"from": current_status, "status": new_status}, tenant=updated.get(TENANT_FIELD))
 
     return {"success": True, "message": f"Status updated → {new_status}"}
 
@@ -168,9 +211,20 @@ async def assign_crew(schedule_id: str, body: AssignCrew, token_data: dict = Dep
     if user["role"] not in ["superadmin", "dispatcher"]:
         raise HTTPException(status_code=403, detail="Not authorized to assign crew")
 
-    sched = await get_schedule_or_404(schedule_id)
+    repo = tenant_repository(user)
+    sched = await get_schedule_or_404(schedule_id, repo)
     now = datetime.utcnow()
-    await db.schedules.update_one({"_id": objid(schedule_id)}, {"$set": {"assigned_crew": body.crew, "updated_at": now}})
+    before = await schedule_cache.version(str(sched["_id"]))
+    sched = await repo.schedules.find_one_and_update(
+        {"_id": sched["_id"]},
+        {"$set": {"assigned_crew": body.crew, "updated_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+    await schedule_cache.put(str(objid(schedule_id)), sched, before, repo.tenant)
+    if not sched:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    await bump_version("schedules", tenant=sched.get(TENANT_FIELD))
+    audit_log.record("schedule", schedule_id, "crew_assigned", user.get("email"), {"assigned_crew": body.crew}, tenant=sched.get(TENANT_FIELD))
     return {"message": "Crew assigned", "assigned_crew": body.crew}
 
 # Cancel schedule
@@ -180,17 +234,34 @@ async def cancel_schedule(schedule_id: str, token_data: dict = Depends(verify_to
     if user["role"] not in ["superadmin", "dispatcher"]:
         raise HTTPException(status_code=403, detail="Not authorized to cancel schedule")
 
-    sched = await get_schedule_or_404(schedule_id)
+    repo = tenant_repository(user)
+    sched = await get_schedule_or_404(schedule_id, repo)
     current_status = sched.get("status", "Scheduled")
 
     if current_status == "Completed":
         raise HTTPException(status_code=400, detail="Cannot cancel a completed schedule")
 
     now = datetime.utcnow()
-    await db.schedules.update_one({"_id": objid(schedule_id)}, {"$set": {"status": "Cancelled", "updated_at": now}})
+    before = await schedule_cache.version(str(sched["_id"]))
+    updated = await repo.schedules.find_one_and_update(
+        {"_id": sched["_id"], "status": {"$ne": "Completed"}},
+        {"$set": {"status": "Cancelled", "updated_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated:
+        await schedule_cache.invalidate(str(sched["_id"]), repo.tenant)
+        raise HTTPException(status_code=400, detail="Cannot cancel a completed schedule")
+    await schedule_cache.put(str(sched["_id"]), updated, before, repo.tenant)
     # Sync flight_request
     fr_id = sched.get("flight_request_id")
     if fr_id:
-        await db.flight_requests.update_one({"_id": objid(fr_id)}, {"$set": {"status": "Cancelled"}})
+        await repo.flight_requests.update_one({"_id": objid(fr_id)}, {"$set": {"status": "Cancelled"}})
+        await flight_request_cache.invalidate(str(objid(fr_id)), repo.tenant)
+    # a schedule always carries its flight request's tenant
+    tenant = updated.get(TENANT_FIELD)
+    await bump_version("schedules", "flight_requests", tenant=tenant)
+    audit_log.record("schedule", schedule_id, "status", user.get("email"), {"from": current_status, "status": "Cancelled"}, tenant=tenant)
+    if fr_id:
+        audit_log.record("flight_request", fr_id, "status", user.get("email"), {"status": "Cancelled"}, tenant=tenant)
 
     return {"message": "Schedule cancelled"}
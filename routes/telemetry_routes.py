@@ -0,0 +1,135 @@
+# routes/telemetry_routes.py
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from database import db
+from models.telemetry import PositionBatchAdapter
+from repository import tenant_of
+from telemetry import telemetry_ingestor, TELEMETRY_COLLECTION
+from utils import verify_token, decode_token, serialize_doc
+from bson import ObjectId
+from datetime import datetime
+from typing import Optional
+
+telemetry_router = APIRouter()
+
+# "aircraft" is the role given to on-board trackers / avionics gateways
+TELEMETRY_ROLES = ["superadmin", "dispatcher", "aircraft"]
+MAX_BATCH = 5000
+MAX_BODY_BYTES = MAX_BATCH * 512   # a full report is ~250 bytes; checked before any parsing
+
+
+def require_telemetry_role(token_data: dict):
+    if token_data.get("role") not in TELEMETRY_ROLES:
+        raise HTTPException(status_code=403, detail="Not authorized to send telemetry")
+
+
+def parse_batch(raw):
+    """JSON array of position reports -> models, validated by pydantic-core straight from bytes"""
+    if len(raw) > MAX_BODY_BYTES:
+        raise ValueError(f"at most {MAX_BODY_BYTES} bytes per batch")
+    reports = PositionBatchAdapter.validate_json(raw)
+    if len(reports) > MAX_BATCH:
+        raise ValueError(f"at most {MAX_BATCH} reports per batch")
+    return reports
+
+
+async def read_body(request: Request, limit: int = MAX_BODY_BYTES) -> bytes:
+    """Request body, refusing (413) as soon as it exceeds `limit` instead of buffering it all"""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=413, detail=f"at most {limit} bytes per batch")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"at most {limit} bytes per batch")
+    return bytes(body)
+
+
+# ---------------------------------------------------------
+# BATCHED HTTP INGEST
+#   POST [{"schedule_id": "...", "ts": "...", "latitude": .., "longitude": .., "ground_speed_kmh": ..}, ...]
+# ---------------------------------------------------------
+@telemetry_router.post("/positions", status_code=202)
+async def ingest_positions(request: Request, token_data: dict = Depends(verify_token)):
+    require_telemetry_role(token_data)
+    body = await read_body(request)
+    try:
+        reports = parse_batch(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    accepted = telemetry_ingestor.submit(reports, tenant_of(token_data))
+    return {"accepted": accepted, "dropped": len(reports) - accepted}
+
+
+# ---------------------------------------------------------
+# WEBSOCKET INGEST (one JSON array of reports per message)
+#   ws://.../api/telemetry/ws?token=...   (or a "token" header)
+# ---------------------------------------------------------
+@telemetry_router.websocket("/ws")
+async def ingest_positions_ws(websocket: WebSocket, token: Optional[str] = None):
+    token_data = decode_token(token or websocket.headers.get("token", ""))
+    if token_data is None or token_data.get("role") not in TELEMETRY_ROLES:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    tenant = tenant_of(token_data)
+
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            raw = message.get("bytes") or message.get("text") or "[]"
+            try:
+                reports = parse_batch(raw)
+            except ValidationError as e:
+                await websocket.send_json({"error": "invalid reports", "detail": e.errors(include_url=False, include_context=False)})
+                continue
+            except ValueError as e:
+                await websocket.send_json({"error": str(e)})
+                continue
+            accepted = telemetry_ingestor.submit(reports, tenant)
+            await websocket.send_json({"accepted": accepted, "dropped": len(reports) - accepted})
+    except WebSocketDisconnect:
+        pass
+
+
+# ---------------------------------------------------------
+# TRACK OF ONE SCHEDULE (newest first)
+# ---------------------------------------------------------
+@telemetry_router.get("/track/{schedule_id}")
+async def schedule_track(
+    schedule_id: str,
+    since: Optional[datetime] = None,
+    limit: int = Query(500, ge=1, le=10000),
+    token_data: dict = Depends(verify_token)
+):
+    if not ObjectId.is_valid(schedule_id):
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    query = {"meta.schedule_id": schedule_id}
+    tenant = tenant_of(token_data)
+    if tenant is not None:
+        query = {"meta.tenant": tenant, **query}
+    if since:
+        query["ts"] = {"$gte": since}
+
+    positions = []
+    async for p in db[TELEMETRY_COLLECTION].find(query, {"_id": 0}).sort("ts", -1).limit(limit):
+        meta = p.pop("meta", {}) or {}
+        p["aircraft"] = meta.get("aircraft")
+        positions.append(serialize_doc(p))
+    return {"schedule_id": schedule_id, "positions": positions}
+
+
+# Ingestor health for this worker
+@telemetry_router.get("/stats")
+async def telemetry_stats(token_data: dict = Depends(verify_token)):
+    if token_data["role"] not in ["superadmin", "dispatcher"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return telemetry_ingestor.stats()
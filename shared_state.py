@@ -0,0 +1,278 @@
+# shared_state.py
+"""
+Key/value state shared by every gunicorn worker.
+
+Each worker is its own process, so a plain dict cache or counter only sees
+the traffic that happened to land on that worker. Anything that must agree
+across workers (version counters, rate limits, cache entries) goes through
+`get_shared_state()` instead.
+
+Backends:
+  * RedisSharedState - used when REDIS_URL is set. Required when running
+    more than one instance; if REDIS_URL is set but `redis` cannot be
+    imported, importing this module fails rather than silently falling back
+    to a per-host store.
+  * LocalSharedState - a small Redis-like store in a SQLite file under
+    /dev/shm, shared by all workers on the same host. No extra service.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # only needed when REDIS_URL is set
+    aioredis = None
+
+load_dotenv()
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL and aioredis is None:
+    # A per-host fallback would let other instances serve stale ETags and
+    # cache hits indefinitely, so refuse to start instead.
+    raise RuntimeError("REDIS_URL is set but the `redis` package is not installed (pip install redis)")
+KEY_PREFIX = "air_ambulance:"
+READ_TIMEOUT = 0.005    # seconds a read may wait for the sqlite lock on the event loop
+WRITE_TIMEOUT = 5       # seconds a write may wait (in its thread) for another worker
+
+logger = logging.getLogger(__name__)
+
+
+def _default_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "air_ambulance_state.sqlite3")
+
+
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH") or _default_path()
+
+
+# ------------------------------------------
+# INTERFACE
+# ------------------------------------------
+class SharedState:
+    """Minimal Redis-style API (string values, integer counters, TTLs)"""
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        return {key: await self.get(key) for key in keys}
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """Set only if the key does not exist yet (SETNX); True if it was set"""
+        raise NotImplementedError
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+# ------------------------------------------
+# LOCAL BACKEND (same host, all workers)
+# ------------------------------------------
+class LocalSharedState(SharedState):
+    """SQLite-in-tmpfs store shared by the workers on one host.
+
+    Reads run on the event loop: with WAL they don't wait for writers, and the
+    short READ_TIMEOUT only applies during a checkpoint. A read that still
+    times out returns "missing" (a cache miss or a fresh ETag), so the loop
+    is never blocked. Writes need the database lock, which another worker may
+    hold, so they run in a thread (one at a time per worker) and wait there.
+    """
+
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        self.path = path
+        self._writer = sqlite3.connect(path, timeout=WRITE_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=OFF")
+        self._writer.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL)"
+        )
+        self._write_lock = threading.Lock()
+        self._reader = sqlite3.connect(path, timeout=READ_TIMEOUT, isolation_level=None, check_same_thread=False)
+
+    @staticmethod
+    def _alive(expires_at) -> bool:
+        return expires_at is None or expires_at > time.time()
+
+    def _read(self, sql: str, params=()) -> list:
+        try:
+            return self._reader.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            logger.debug("shared state read timed out; treating as missing", exc_info=True)
+            return []
+
+    async def _write(self, fn, *args):
+        def locked():
+            with self._write_lock:
+                return fn(*args)
+        return await asyncio.to_thread(locked)
+
+    # ---------------- reads (on the loop) ---------------- #
+    async def get(self, key: str) -> Optional[str]:
+        rows = self._read("SELECT value, expires_at FROM kv WHERE key = ?", (key,))
+        if not rows or not self._alive(rows[0][1]):
+            return None
+        return rows[0][0]
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        keys = list(keys)
+        result = {key: None for key in keys}
+        if not keys:
+            return result
+        marks = ",".join("?" * len(keys))
+        for key, value, expires_at in self._read(f"SELECT key, value, expires_at FROM kv WHERE key IN ({marks})", keys):
+            if self._alive(expires_at):
+                result[key] = value
+        return result
+
+    # ---------------- writes (in a thread) ---------------- #
+    def _set(self, key: str, value: str, ttl: Optional[float]):
+        expires_at = time.time() + ttl if ttl else None
+        self._writer.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, str(value), expires_at),
+        )
+
+    def _add(self, key: str, value: str, ttl: Optional[float]) -> bool:
+        conn = self._writer
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+            added = row is None or not self._alive(row[0])
+            if added:
+                conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, str(value), time.time() + ttl if ttl else None),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def _incr(self, key: str, amount: int) -> int:
+        conn = self._writer
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+            if row is None or not self._alive(row[1]):
+                value, expires_at = amount, None
+            else:
+                value, expires_at = int(row[0]) + amount, row[1]
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, str(value), expires_at),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def _delete(self, key: str):
+        self._writer.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        await self._write(self._set, key, value, ttl)
+
+    async def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        return await self._write(self._add, key, value, ttl)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return await self._write(self._incr, key, amount)
+
+    async def delete(self, key: str):
+        await self._write(self._delete, key)
+
+    async def close(self):
+        self._reader.close()
+        self._writer.close()
+
+
+# ------------------------------------------
+# REDIS BACKEND (multi-instance)
+# ------------------------------------------
+class RedisSharedState(SharedState):
+    def __init__(self, url: str = REDIS_URL):
+        self._redis = aioredis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._redis.get(KEY_PREFIX + key)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = await self._redis.mget([KEY_PREFIX + k for k in keys])
+        return dict(zip(keys, values))
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        await self._redis.set(KEY_PREFIX + key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        return bool(await self._redis.set(KEY_PREFIX + key, value, nx=True, px=int(ttl * 1000) if ttl else None))
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return await self._redis.incrby(KEY_PREFIX + key, amount)
+
+    async def delete(self, key: str):
+        await self._redis.delete(KEY_PREFIX + key)
+
+    async def close(self):
+        await self._redis.close()
+
+
+# ------------------------------------------
+# PER-PROCESS ACCESSOR
+# ------------------------------------------
+_state = None
+_state_pid = None
+
+
+def get_shared_state() -> SharedState:
+    """Return this worker's handle to the shared store (never shared across fork)"""
+    global _state, _state_pid
+    pid = os.getpid()
+    if _state is None or _state_pid != pid:
+        if REDIS_URL:
+            _state = RedisSharedState(REDIS_URL)
+        else:
+            _state = LocalSharedState(SHARED_STATE_PATH)
+        _state_pid = pid
+    return _state
+
+
+async def close_shared_state():
+    global _state, _state_pid
+    if _state is not None and _state_pid == os.getpid():
+        await _state.close()
+    _state = None
+    _state_pid = None
+
+
+def reset_local_state(path: str = SHARED_STATE_PATH):
+    """Drop the local store; called once by the gunicorn master before forking"""
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
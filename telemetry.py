@@ -0,0 +1,364 @@
+# telemetry.py
+"""
+Aircraft position ingestion (routes in routes/telemetry_routes.py).
+
+`telemetry_ingestor.submit(reports)` only touches memory: every fix is
+appended to a pending buffer, and the newest fix per schedule replaces the
+previous one (coalescing). A background task flushes once a second (sooner
+when the buffer fills):
+
+  * all buffered fixes go to the `telemetry` time-series collection with
+    insert_many (time field `ts`, meta field `meta` = schedule, aircraft,
+    tenant), BATCH_SIZE documents per call. The tenant is the schedule's,
+    not the sender's, so fixes relayed by an unscoped gateway still show up
+    in the owner's track; fixes for unknown schedules, or sent by another
+    operator's token, are rejected;
+  * for the newest fix of each schedule, the arrival time is projected
+    (remaining great-circle distance to the destination / ground speed).
+    Only when it moved by more than ETA_THRESHOLD_SECONDS from the stored
+    eta is the schedule updated - all such updates in one bulk_write, guarded
+    on status "In-Transit".
+
+So the database sees a handful of writes per flush, however many reports
+arrive. Destinations come from the flight request's `to_location`
+({"lat", "lng"}) or, failing that, the site registry entry for its
+`to_hospital`; they are cached per schedule for TARGET_TTL_SECONDS.
+
+Every worker runs its own ingestor; a schedule reported to two workers may
+get its eta written twice, which is harmless.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from database import db
+from http_cache import bump_version
+from audit_log import audit_log
+from query_cache import schedule_cache
+from repository import TENANT_FIELD
+from route_planner import haversine_km, route_planner
+from models.telemetry import PositionReport
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_COLLECTION = "telemetry"
+FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_SECONDS", "1.0"))
+BATCH_SIZE = 1000                # fixes per insert_many
+MAX_BUFFERED = int(os.getenv("TELEMETRY_MAX_BUFFERED", "100000"))   # fixes held before new ones are dropped
+ETA_THRESHOLD_SECONDS = float(os.getenv("ETA_UPDATE_THRESHOLD_SECONDS", "120"))
+RETENTION_DAYS = int(os.getenv("TELEMETRY_RETENTION_DAYS", "30"))
+TARGET_TTL_SECONDS = 30          # how long a schedule's destination/eta/status is trusted
+MIN_SPEED_KMH = 20.0             # slower than this (taxiing, hovering) -> no projection
+MAX_TRACKED = 20000              # schedules with cached targets before expired ones are pruned
+
+
+async def ensure_telemetry_collection():
+    """Create the time-series collection (falls back to a plain one on old servers)"""
+    try:
+        await db.create_collection(
+            TELEMETRY_COLLECTION,
+            timeseries={"timeField": "ts", "metaField": "meta", "granularity": "seconds"},
+            expireAfterSeconds=RETENTION_DAYS * 86400,
+        )
+    except CollectionInvalid:
+        pass  # already exists
+    except OperationFailure:
+        logger.warning("time-series collections unsupported; using a regular collection for telemetry")
+    await db[TELEMETRY_COLLECTION].create_index(
+        [("meta.tenant", ASCENDING), ("meta.schedule_id", ASCENDING), ("ts", DESCENDING)]
+    )
+
+
+def _destination(flight_request: dict) -> Optional[Tuple[float, float]]:
+    loc = flight_request.get("to_location") or {}
+    lat = loc.get("lat", loc.get("latitude"))
+    lon = loc.get("lng", loc.get("lon", loc.get("longitude")))
+    if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+        return float(lat), float(lon)
+    hospital = flight_request.get("to_hospital")
+    if hospital:
+        try:
+            site = route_planner.sites[route_planner.resolve(hospital)]
+            return site["latitude"], site["longitude"]
+        except KeyError:
+            pass
+    return None
+
+
+class TelemetryIngestor:
+    def __init__(self):
+        self._points: List[dict] = []                                   # fixes waiting for insert_many
+        self._latest: Dict[str, Tuple[PositionReport, Optional[str]]] = {}  # schedule -> newest (fix, tenant)
+        self._fixes: Dict[str, Tuple[datetime, float, float]] = {}     # schedule -> previous fix (speed fallback)
+        self._targets: Dict[str, Tuple[datetime, Optional[dict]]] = {} # schedule -> (loaded_at, target or None)
+        self._owners: Dict[str, Optional[str]] = {}                    # schedule -> tenant (loaded with targets)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.written = 0
+        self.write_failures = 0
+        self.eta_updates = 0
+        self.flushes = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush what is buffered, then stop the writer"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("dropping buffered telemetry on shutdown")
+
+    # ---------------- ingest (memory only) ---------------- #
+    def submit(self, reports: List[PositionReport], tenant: Optional[str] = None) -> int:
+        """Buffer a batch of fixes; returns how many were accepted (the rest are dropped)"""
+        room = MAX_BUFFERED - len(self._points)
+        accepted = reports[:max(room, 0)]
+        self.received += len(reports)
+        self.dropped += len(reports) - len(accepted)
+
+        for r in accepted:
+            schedule_id = str(r.schedule_id)
+            self._points.append({
+                "ts": r.ts,
+                "meta": {"schedule_id": schedule_id, "aircraft": r.aircraft, "tenant": tenant},
+                "latitude": r.latitude,
+                "longitude": r.longitude,
+                "altitude_m": r.altitude_m,
+                "ground_speed_kmh": r.ground_speed_kmh,
+                "heading_deg": r.heading_deg,
+            })
+            newest = self._latest.get(schedule_id)
+            if newest is None or r.ts >= newest[0].ts:
+                self._latest[schedule_id] = (r, tenant)
+
+        if len(self._points) >= BATCH_SIZE:
+            self._wakeup.set()
+        return len(accepted)
+
+    # ---------------- flush ---------------- #
+    async def flush(self):
+        # Swap the buffers before the first await; new fixes go to fresh ones.
+        points, self._points = self._points, []
+        latest, self._latest = self._latest, {}
+        if latest:
+            # every buffered fix also updated `latest`, so this covers all of `points`
+            now = datetime.utcnow()
+            fresh_after = now - timedelta(seconds=TARGET_TTL_SECONDS)
+            stale = [sid for sid in latest if sid not in self._targets or self._targets[sid][0] < fresh_after]
+            if stale:
+                await self._load_targets(stale, now)
+            points = self._stamp_owners(points)
+        if points:
+            await self._write_points(points)
+        if latest:
+            await self._update_etas(latest)
+        self.flushes += 1
+
+    def _stamp_owners(self, points: List[dict]) -> List[dict]:
+        """Replace each fix's sender tenant with its schedule's tenant; drop foreign/unknown ones"""
+        kept = []
+        for p in points:
+            meta = p["meta"]
+            schedule_id = meta["schedule_id"]
+            if schedule_id not in self._owners:
+                continue
+            owner = self._owners[schedule_id]
+            if meta["tenant"] is not None and meta["tenant"] != owner:
+                continue
+            meta["tenant"] = owner
+            kept.append(p)
+        self.rejected += len(points) - len(kept)
+        return kept
+
+    async def _write_points(self, points: List[dict]):
+        for start in range(0, len(points), BATCH_SIZE):
+            chunk = points[start:start + BATCH_SIZE]
+            try:
+                await db[TELEMETRY_COLLECTION].insert_many(chunk, ordered=False)
+                self.written += len(chunk)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Positions are superseded within seconds; don't let a backlog build up.
+                logger.exception("telemetry batch of %d failed; dropped", len(chunk))
+                self.write_failures += len(chunk)
+
+    async def _load_targets(self, schedule_ids: List[str], now: datetime):
+        """Refresh owner, and destination + current eta for In-Transit schedules (2 queries per flush)"""
+        schedules, found = {}, set()
+        async for s in db.schedules.find(
+            {"_id": {"$in": [ObjectId(i) for i in schedule_ids]}},
+            {"flight_request_id": 1, "eta": 1, "estimated_duration_minutes": 1, "status": 1, TENANT_FIELD: 1},
+        ):
+            schedule_id = str(s["_id"])
+            found.add(schedule_id)
+            self._owners[schedule_id] = s.get(TENANT_FIELD)
+            if s.get("status") == "In-Transit":
+                schedules[schedule_id] = s
+        for schedule_id in schedule_ids:
+            if schedule_id not in found:
+                self._owners.pop(schedule_id, None)
+
+        fr_ids = {s["flight_request_id"] for s in schedules.values() if ObjectId.is_valid(s.get("flight_request_id") or "")}
+        flight_requests = {}
+        if fr_ids:
+            async for fr in db.flight_requests.find(
+                {"_id": {"$in": [ObjectId(i) for i in fr_ids]}}, {"to_location": 1, "to_hospital": 1}
+            ):
+                flight_requests[str(fr["_id"])] = fr
+        if any("to_location" not in fr for fr in flight_requests.values()):
+            await route_planner.ensure_current()
+
+        for schedule_id in schedule_ids:
+            target = None
+            s = schedules.get(schedule_id)
+            fr = flight_requests.get(s.get("flight_request_id")) if s else None
+            dest = _destination(fr) if fr else None
+            if dest is not None:
+                eta = s.get("eta") or {}
+                target = {
+                    "tenant": s.get(TENANT_FIELD),
+                    "lat": dest[0],
+                    "lon": dest[1],
+                    "eta_utc": eta.get("eta_utc"),
+                    "estimated_duration_minutes": eta.get("estimated_duration_minutes", s.get("estimated_duration_minutes")),
+                }
+            self._targets[schedule_id] = (now, target)  # None is cached too: not in transit / no destination
+
+        if len(self._targets) > MAX_TRACKED:
+            expired = now - timedelta(seconds=TARGET_TTL_SECONDS)
+            self._targets = {k: v for k, v in self._targets.items() if v[0] >= expired}
+            self._fixes = {k: v for k, v in self._fixes.items() if k in self._targets}
+            self._owners = {k: v for k, v in self._owners.items() if k in self._targets}
+
+    def _speed_kmh(self, schedule_id: str, r: PositionReport) -> Optional[float]:
+        previous = self._fixes.get(schedule_id)
+        self._fixes[schedule_id] = (r.ts, r.latitude, r.longitude)
+        if r.ground_speed_kmh is not None:
+            return r.ground_speed_kmh
+        if previous is None or r.ts <= previous[0]:
+            return None
+        hours = (r.ts - previous[0]).total_seconds() / 3600
+        return float(haversine_km(previous[1], previous[2], r.latitude, r.longitude)) / hours
+
+    async def _update_etas(self, latest: Dict[str, Tuple[PositionReport, Optional[str]]]):
+        """Targets are already fresh: flush() loads them before writing the fixes"""
+        now = datetime.utcnow()
+        rows = []
+        for schedule_id, (r, tenant) in latest.items():
+            target = self._targets[schedule_id][1]
+            if target is None or (tenant is not None and target["tenant"] != tenant):
+                continue
+            speed = self._speed_kmh(schedule_id, r)
+            if speed is None or speed < MIN_SPEED_KMH:
+                continue
+            rows.append((schedule_id, r, target, speed))
+        if not rows:
+            return
+
+        # One vectorized haversine for the whole flush
+        remaining_km = haversine_km(
+            [r.latitude for _, r, _, _ in rows], [r.longitude for _, r, _, _ in rows],
+            [t["lat"] for _, _, t, _ in rows], [t["lon"] for _, _, t, _ in rows],
+        )
+        remaining_hours = remaining_km / np.array([speed for _, _, _, speed in rows])
+
+        ops, changes = [], []
+        for (schedule_id, r, target, _), hours in zip(rows, remaining_hours):
+            eta_utc = r.ts + timedelta(hours=float(hours))
+            current = target["eta_utc"]
+            if current is not None and abs((eta_utc - current).total_seconds()) <= ETA_THRESHOLD_SECONDS:
+                continue
+            eta_doc = {
+                "eta_utc": eta_utc,
+                "estimated_duration_minutes": target["estimated_duration_minutes"],
+                "last_updated": now,
+            }
+            ops.append(UpdateOne(
+                {"_id": r.schedule_id, "status": "In-Transit"},
+                {"$set": {"eta": eta_doc, "updated_at": now}},
+            ))
+            changes.append((schedule_id, target, eta_doc, current))
+        if not ops:
+            return
+
+        result = await db.schedules.bulk_write(ops, ordered=False)
+        if result.modified_count < len(ops):
+            # Some schedules left In-Transit meanwhile; keep only the ones that were written.
+            written = {str(s["_id"]) async for s in db.schedules.find(
+                {"_id": {"$in": [ObjectId(c[0]) for c in changes]}, "eta.last_updated": now}, {"_id": 1}
+            )}
+            for schedule_id, target, _, _ in changes:
+                if schedule_id not in written:
+                    self._targets.pop(schedule_id, None)
+            changes = [c for c in changes if c[0] in written]
+
+        tenants = set()
+        for schedule_id, target, eta_doc, previous in changes:
+            target["eta_utc"] = eta_doc["eta_utc"]
+            await schedule_cache.invalidate(schedule_id)
+            tenants.add(target["tenant"])
+            audit_log.record("schedule", schedule_id, "eta_updated", "system:telemetry", {
+                "eta": eta_doc,
+                "previous_eta_utc": previous,
+            }, tenant=target["tenant"])
+        for tenant in tenants:
+            await bump_version("schedules", tenant=tenant)
+        self.eta_updates += len(changes)
+
+    # ---------------- background loop ---------------- #
+    async def _run(self):
+        try:
+            await ensure_telemetry_collection()
+        except Exception:
+            logger.exception("could not prepare the telemetry collection")
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("telemetry flush failed")
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._points),
+            "tracked_schedules": len(self._targets),
+            "received": self.received,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "written": self.written,
+            "write_failures": self.write_failures,
+            "eta_updates": self.eta_updates,
+            "flushes": self.flushes,
+            "eta_threshold_seconds": ETA_THRESHOLD_SECONDS,
+        }
+
+
+telemetry_ingestor = TelemetryIngestor()
@@ -3,6 +3,7 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, Header, UploadFile
 from bson import ObjectId
+from typing import Optional
 import os
 from dotenv import load_dotenv
 import shutil
@@ -64,6 +65,13 @@ async def verify_token(token: str = Header(...)):
     return payload
 
 
+async def optional_token(token: Optional[str] = Header(None)):
+    """Token claims on public routes; None (anonymous) if no valid token was sent"""
+    if token is None:
+        return None
+    return decode_token(token)
+
+
 # ------------------------------------------
 # FILE UPLOAD FUNCTION
 # ------------------------------------------